@@ -1,28 +1,105 @@
 import os
 import io
+import json
 import base64
-from functools import wraps
-from flask import Flask, request, jsonify, session, redirect, url_for, send_from_directory
+import hashlib
+import mimetypes
+import csv
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps, lru_cache
+from flask import Flask, request, jsonify, session, redirect, url_for, send_from_directory, Response, g, has_request_context, stream_with_context
+from flask.ctx import RequestContext
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user, user_logged_in, user_logged_out
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from urllib.request import urlopen
+import queue
 import secrets
+import threading
+import time
+import click
 import qrcode
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
 
-app = Flask(__name__, static_folder='.', static_url_path='')
+app = Flask(__name__, static_folder=None)
 
-# SQLite setup (file-based database)
+# Database setup: DATABASE_URL selects the backend, defaulting to a SQLite file
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'app.db')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000)),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+}
+
+def database_url():
+    url = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'app.db'))
+    # Hosted Postgres add-ons still hand out the postgres:// scheme SQLAlchemy dropped
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def database_engine_options(url):
+    """
+    Connection pool settings for one worker process. Each gunicorn worker has
+    its own pool, so DB_MAX_CONNECTIONS (the server's budget for this app) is
+    split across WEB_CONCURRENCY workers; without it every worker gets
+    DB_POOL_SIZE connections plus DB_MAX_OVERFLOW.
+    """
+    options = {'pool_pre_ping': True}
+    if url.startswith('sqlite') and (url in ('sqlite://', 'sqlite:///') or ':memory:' in url):
+        return options
+    
+    budget = os.environ.get('DB_MAX_CONNECTIONS')
+    if budget:
+        workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+        options['pool_size'] = max(1, int(budget) // workers)
+        options['max_overflow'] = 0
+    else:
+        options['pool_size'] = int(os.environ.get('DB_POOL_SIZE', 5))
+        options['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    options['pool_timeout'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    options['pool_recycle'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection: WAL lets readers run alongside the
+    single writer, busy_timeout makes writers queue instead of failing with
+    "database is locked", and synchronous=NORMAL is safe under WAL.
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize the database
 db = SQLAlchemy(app)
 
-from models import User, Account, Transaction, Investment, Trade, Loan, CopyTrading, BotTrading, Referral, SupportTicket, Notification, TradeRule, Subscription
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        db.event.listen(db.engine, 'connect', apply_sqlite_pragmas)
+
+from models import User, Account, Transaction, Investment, Trade, Loan, CopyTrading, BotTrading, Referral, SupportTicket, Notification, TradeRule, Subscription, TradingSummary, LedgerEntry, BalanceSnapshot
+import serializers
+import assets
+
+if serializers.orjson:
+    app.json = serializers.OrjsonProvider(app)
 
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
@@ -80,43 +157,250 @@ CRYPTO_WALLETS = {
     }
 }
 
-login_manager = LoginManager()
-login_manager.init_app(app)
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
 with app.app_context():
     db.create_all()
 
+QR_CACHE_MAX_AGE = 86400
+
+@lru_cache(maxsize=64)
 def generate_qr_code(data):
+    """
+    Render a QR code PNG for the given data once and keep it in memory.
+    Returns (png_bytes, etag); wallet addresses never change at runtime.
+    """
     qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
     qr.add_data(data)
     qr.make(fit=True)
     img = qr.make_image(fill_color="black", back_color="white")
     buffer = io.BytesIO()
     img.save(buffer, format='PNG')
-    buffer.seek(0)
-    img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    return f"data:image/png;base64,{img_base64}"
+    png = buffer.getvalue()
+    return png, hashlib.sha1(png).hexdigest()
+
+def wallet_qr_url(crypto_id):
+    _, etag = generate_qr_code(CRYPTO_WALLETS[crypto_id]['address'])
+    return url_for('get_crypto_wallet_qr', crypto_id=crypto_id, v=etag[:12])
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 
+IDENTITY_CACHE_TTL = float(os.environ.get('IDENTITY_CACHE_TTL', 0))
+
+def column_values(instance):
+    return {attr.key: getattr(instance, attr.key) for attr in db.inspect(instance).mapper.column_attrs}
+
+class IdentityCache:
+    """
+    Optional process-local copy of each user's User and Account columns, so
+    read-only requests within IDENTITY_CACHE_TTL seconds skip the identity
+    query. Entries are dropped on any write request by the user and on every
+    balance change made in this process; changes made by other workers show
+    up once the entry expires. Disabled when the TTL is 0 (the default).
+    """
+    MAX_ENTRIES = 10000
+    # Left unloaded on restored users so it is always read fresh (see user_etag)
+    UNCACHED = ('data_version',)
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+    
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1], entry[2]
+    
+    def put(self, user):
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._entries) >= self.MAX_ENTRIES:
+            for user_id, entry in list(self._entries.items()):
+                if entry[0] < now:
+                    self._entries.pop(user_id, None)
+        account = user.account
+        user_values = column_values(user)
+        for key in self.UNCACHED:
+            del user_values[key]
+        self._entries[user.id] = (now + self.ttl, user_values, column_values(account) if account else None)
+    
+    def invalidate(self, user_id):
+        self._entries.pop(user_id, None)
+
+identity_cache = IdentityCache(IDENTITY_CACHE_TTL)
+
+def restore_identity(user_values, account_values):
+    """Attach cached User/Account copies to this request's session without querying."""
+    user = User(**user_values)
+    make_transient_to_detached(user)
+    user = db.session.merge(user, load=False)
+    
+    account = None
+    if account_values is not None:
+        account = Account(**account_values)
+        make_transient_to_detached(account)
+        account = db.session.merge(account, load=False)
+    set_committed_value(user, 'account', account)
+    return user
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """
+    The single identity-loading path: the user and their account come back in
+    one joined query and handlers reuse current_user.account for the rest of
+    the request.
+    """
+    user_id = int(user_id)
+    read_only = request.method in ('GET', 'HEAD')
+    if read_only:
+        cached = identity_cache.get(user_id)
+        if cached is not None:
+            return restore_identity(*cached)
+    else:
+        identity_cache.invalidate(user_id)
+    
+    user = db.session.get(User, user_id, options=[db.joinedload(User.account)])
+    if user is not None and read_only:
+        identity_cache.put(user)
+    return user
+
+# Readable tokens api.js follows to keep its cache honest whichever page sent
+# the request, plain fetch included: cache_owner names the current login (the
+# cache is dropped when it changes) and cache_version is rotated whenever a
+# request changes the logged-in user's data (the cache is expired).
+CACHE_OWNER_COOKIE = 'cache_owner'
+CACHE_VERSION_COOKIE = 'cache_version'
+
+@user_logged_in.connect_via(app)
+def new_cache_owner(sender, user):
+    g.cache_owner = secrets.token_hex(8)
+
+@user_logged_out.connect_via(app)
+def clear_cache_owner(sender, user):
+    g.cache_owner = ''
+
+@app.after_request
+def set_cache_cookies(response):
+    owner = g.pop('cache_owner', None)
+    if owner:
+        response.set_cookie(CACHE_OWNER_COOKIE, owner, samesite='Lax', secure=request.is_secure)
+    elif owner == '':
+        response.delete_cookie(CACHE_OWNER_COOKIE)
+    
+    # Flask-Login's session key, so no user row is loaded just to compare ids
+    changed = g.pop('data_changed_users', set())
+    if changed and str(session.get('_user_id')) in {str(user_id) for user_id in changed}:
+        response.set_cookie(CACHE_VERSION_COOKIE, secrets.token_hex(8), samesite='Lax', secure=request.is_secure)
+    return response
+
+def touch_user_data(user_id):
+    """Mark a user's data as changed in the current transaction; their data_version is bumped on commit."""
+    db.session.info.setdefault('touched_users', set()).add(user_id)
+
+@db.event.listens_for(db.session, 'before_flush')
+def touch_flushed_users(session, flush_context, instances):
+    """Every ORM row written with a user_id (or a User itself) touches that user."""
+    touched = session.info.setdefault('touched_users', set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        touched.add(instance.id if isinstance(instance, User) else getattr(instance, 'user_id', None))
+
+@db.event.listens_for(db.session, 'before_commit')
+def bump_data_versions(session):
+    """
+    Increment data_version for every user touched in this transaction, with
+    one UPDATE committed together with the changes. Set-based writes that
+    bypass the ORM call touch_user_data themselves. Inside a request the
+    users are also noted for set_cache_cookies.
+    """
+    session.flush()
+    touched = session.info.pop('touched_users', set())
+    touched.discard(None)
+    if touched:
+        users = User.__table__
+        session.execute(
+            users.update()
+            .where(users.c.id.in_(sorted(touched)))
+            .values(data_version=db.func.coalesce(users.c.data_version, 0) + 1)
+        )
+        if has_request_context():
+            g.data_changed_users = g.get('data_changed_users', set()) | touched
+
+@db.event.listens_for(db.session, 'after_rollback')
+def forget_touched_users(session):
+    session.info.pop('touched_users', None)
+
+def user_etag(period=None):
+    """
+    Conditional GET for endpoints that only show the current user's data. The
+    ETag is derived from the user's data_version (plus the URL), so a matching
+    If-None-Match is answered with 304 before the handler runs any of its
+    queries. period (seconds) also rolls the tag over on a clock, for
+    responses with time-relative fields.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            parts = [current_user.id, current_user.data_version or 0, request.full_path]
+            if period:
+                parts.append(int(time.time() // period))
+            etag = hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+            
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
+ASSET_BUILD_DIR = os.environ.get('ASSET_BUILD_DIR', os.path.join(basedir, 'build'))
+ASSET_MAX_AGE = 365 * 86400
+
+# Built once with `flask --app app build-assets`; empty (serve the source files) until then
+static_assets = assets.load_manifest(ASSET_BUILD_DIR)
+
+def send_asset(filename):
+    """
+    Serve a built file in the best encoding the client accepts, with a strong
+    ETag so revalidations get a 304. Fingerprinted files are cached for a
+    year; pages must revalidate. Falls back to the source tree for anything
+    the build does not know about.
+    """
+    entry = static_assets.get(filename)
+    if entry is None:
+        return send_from_directory('.', filename)
+    
+    encoding = next((e for e in entry['encodings'] if request.accept_encodings[e]), None)
+    suffix = {'br': '.br', 'gzip': '.gz', None: ''}[encoding]
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(ASSET_BUILD_DIR, entry['file'] + suffix, mimetype=mimetype,
+                                   etag=f"{entry['etag']}-{encoding}" if encoding else entry['etag'], conditional=False)
+    if encoding:
+        response.content_encoding = encoding
+    if entry['encodings']:
+        response.vary.add('Accept-Encoding')
+    if entry['immutable']:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/')
 def index():
-    return send_from_directory('.', 'INDEX.html')
+    return send_asset('INDEX.html')
 
 @app.route('/<path:filename>')
 def serve_static(filename):
-    if filename.endswith('.html'):
-        return send_from_directory('.', filename)
-    return send_from_directory('.', filename)
+    return send_asset(filename)
 
 @app.route('/uploads/<path:filename>')
 def serve_upload(filename):
@@ -146,6 +430,7 @@ def register():
     
     account = Account(user_id=user.id)
     db.session.add(account)
+    db.session.add_all([TradingSummary(user_id=user.id, is_demo=is_demo) for is_demo in (True, False)])
     
     referral = Referral(
         referrer_id=user.id,
@@ -217,6 +502,7 @@ def check_auth():
 
 @app.route('/api/user/profile', methods=['GET'])
 @login_required
+@user_etag()
 def get_profile():
     account = current_user.account
     referral = Referral.query.filter_by(referrer_id=current_user.id).first()
@@ -268,11 +554,16 @@ def update_profile():
 
 @app.route('/api/dashboard', methods=['GET'])
 @login_required
+@user_etag()
 def get_dashboard():
     account = current_user.account
-    recent_transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.created_at.desc()).limit(5).all()
-    active_investments = Investment.query.filter_by(user_id=current_user.id, status='active').all()
-    open_trades = Trade.query.filter_by(user_id=current_user.id, status='open').all()
+    recent_transactions = db.session.query(*serializers.RECENT_TRANSACTION.columns).filter(
+        Transaction.user_id == current_user.id
+    ).order_by(Transaction.created_at.desc()).limit(5).all()
+    active_investments = db.session.query(*serializers.ACTIVE_INVESTMENT.columns).filter(
+        Investment.user_id == current_user.id, Investment.status == 'active'
+    ).all()
+    summaries = get_trading_summaries(current_user.id)
     
     return jsonify({
         'account': {
@@ -282,61 +573,87 @@ def get_dashboard():
             'total_deposits': account.total_deposits if account else 0,
             'total_withdrawals': account.total_withdrawals if account else 0
         },
-        'recent_transactions': [{
-            'id': t.id,
-            'type': t.type,
-            'amount': t.amount,
-            'status': t.status,
-            'created_at': t.created_at.isoformat()
-        } for t in recent_transactions],
-        'active_investments': [{
-            'id': i.id,
-            'plan_name': i.plan_name,
-            'amount': i.amount,
-            'expected_return': i.expected_return,
-            'status': i.status
-        } for i in active_investments],
-        'open_trades': len(open_trades)
+        'recent_transactions': serializers.RECENT_TRANSACTION.rows(recent_transactions),
+        'active_investments': serializers.ACTIVE_INVESTMENT.rows(active_investments),
+        'open_trades': sum(summary.open_trades for summary in summaries.values())
     })
 
+def encode_cursor(sort_value, row_id):
+    raw = json.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+def keyset_page(query, sort_column, id_column):
+    """
+    Cursor pagination ordered by (sort_column, id) descending. Each page is a
+    single indexed range scan no matter how deep it is; the COUNT is only run
+    when the client asks for it with count=true.
+    Returns (items, next_cursor, total). Raises ValueError on a bad cursor.
+    """
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    cursor = request.args.get('cursor')
+    
+    total = None
+    if request.args.get('count', 'false').lower() == 'true':
+        total = query.order_by(None).count()
+    
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            sort_column < sort_value,
+            db.and_(sort_column == sort_value, id_column < row_id)
+        ))
+    
+    items = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+    
+    return items, next_cursor, total
+
 @app.route('/api/transactions', methods=['GET'])
 @login_required
+@user_etag()
 def get_transactions():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     tx_type = request.args.get('type')
     
-    query = Transaction.query.filter_by(user_id=current_user.id)
+    query = db.session.query(*serializers.TRANSACTION.columns).filter(Transaction.user_id == current_user.id)
     if tx_type:
-        query = query.filter_by(type=tx_type)
+        query = query.filter(Transaction.type == tx_type)
     
-    transactions = query.order_by(Transaction.created_at.desc()).paginate(page=page, per_page=per_page)
+    if 'cursor' in request.args:
+        try:
+            items, next_cursor, total = keyset_page(query, Transaction.created_at, Transaction.id)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+        pagination = {'next_cursor': next_cursor, 'total': total}
+    else:
+        transactions = query.order_by(Transaction.created_at.desc()).paginate(page=page, per_page=per_page)
+        items = transactions.items
+        pagination = {'total': transactions.total, 'pages': transactions.pages, 'current_page': page}
     
     return jsonify({
         'success': True,
-        'transactions': [{
-            'id': t.id,
-            'type': t.type,
-            'amount': t.amount,
-            'status': t.status,
-            'payment_method': t.payment_method,
-            'crypto_type': t.crypto_type,
-            'crypto_network': t.crypto_network,
-            'txid': t.txid,
-            'description': t.description,
-            'created_at': t.created_at.isoformat(),
-            'completed_at': t.completed_at.isoformat() if t.completed_at else None
-        } for t in transactions.items],
-        'total': transactions.total,
-        'pages': transactions.pages,
-        'current_page': page
+        'transactions': serializers.TRANSACTION.rows(items),
+        **pagination
     })
 
 @app.route('/api/crypto/wallets', methods=['GET'])
 def get_crypto_wallets():
     wallets = []
     for key, wallet in CRYPTO_WALLETS.items():
-        qr_code = generate_qr_code(wallet['address'])
         wallets.append({
             'id': key,
             'name': wallet['name'],
@@ -344,7 +661,7 @@ def get_crypto_wallets():
             'network': wallet['network'],
             'address': wallet['address'],
             'icon': wallet['icon'],
-            'qr_code': qr_code
+            'qr_code': wallet_qr_url(key)
         })
     return jsonify({'success': True, 'wallets': wallets})
 
@@ -355,7 +672,6 @@ def get_crypto_wallet(crypto_id):
         return jsonify({'success': False, 'message': 'Invalid cryptocurrency'}), 400
     
     wallet = CRYPTO_WALLETS[crypto_id]
-    qr_code = generate_qr_code(wallet['address'])
     
     return jsonify({
         'success': True,
@@ -366,10 +682,24 @@ def get_crypto_wallet(crypto_id):
             'network': wallet['network'],
             'address': wallet['address'],
             'icon': wallet['icon'],
-            'qr_code': qr_code
+            'qr_code': wallet_qr_url(crypto_id)
         }
     })
 
+@app.route('/api/crypto/wallet/<crypto_id>/qr.png', methods=['GET'])
+def get_crypto_wallet_qr(crypto_id):
+    crypto_id = crypto_id.upper()
+    if crypto_id not in CRYPTO_WALLETS:
+        return jsonify({'success': False, 'message': 'Invalid cryptocurrency'}), 404
+    
+    png, etag = generate_qr_code(CRYPTO_WALLETS[crypto_id]['address'])
+    
+    response = Response(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = QR_CACHE_MAX_AGE
+    return response.make_conditional(request)
+
 @app.route('/api/deposit/crypto', methods=['POST'])
 @login_required
 def create_crypto_deposit():
@@ -476,13 +806,233 @@ def create_deposit():
         'reference': transaction.reference
     })
 
+def parse_amount(value):
+    """Return value as a positive float, or None if it is missing, invalid or not positive."""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None
+    return amount if amount > 0 and amount != float('inf') else None
+
+LEDGER_FIELDS = ('balance', 'demo_balance', 'total_profit', 'total_deposits', 'total_withdrawals')
+
+def record_ledger(user_id, kind, reference, deltas):
+    """Append one ledger entry per non-zero Account column delta, in the caller's transaction."""
+    identity_cache.invalidate(user_id)
+    touch_user_data(user_id)
+    db.session.add_all([
+        LedgerEntry(user_id=user_id, field=field, amount=amount, kind=kind, reference=reference)
+        for field, amount in deltas.items() if amount
+    ])
+
+def debit_account(user_id, amount, kind, reference=None, column='balance', **totals):
+    """
+    Take amount from an account balance column with one conditional UPDATE
+    (balance = balance - :amount WHERE balance >= :amount), so concurrent
+    requests in other workers can never overdraw it. Extra keyword arguments
+    are added to other Account columns in the same statement, and every change
+    is appended to the ledger. Returns False, changing nothing, when the funds
+    are not there.
+    """
+    balance = getattr(Account, column)
+    values = {balance: balance - amount}
+    values.update({getattr(Account, name): getattr(Account, name) + delta for name, delta in totals.items()})
+    if Account.query.filter(Account.user_id == user_id, balance >= amount).update(
+        values, synchronize_session='fetch'
+    ) != 1:
+        return False
+    record_ledger(user_id, kind, reference, {column: -amount, **totals})
+    return True
+
+def credit_account(user_id, amount, kind, reference=None, column='balance', **totals):
+    """Add amount to an account balance column in SQL and ledger it. Returns False if the account is missing."""
+    balance = getattr(Account, column)
+    values = {balance: balance + amount}
+    values.update({getattr(Account, name): getattr(Account, name) + delta for name, delta in totals.items()})
+    if Account.query.filter(Account.user_id == user_id).update(
+        values, synchronize_session='fetch'
+    ) != 1:
+        return False
+    record_ledger(user_id, kind, reference, {column: amount, **totals})
+    return True
+
+def reset_account_balance(user_id, value, kind, column='demo_balance'):
+    """
+    Set a balance column to an absolute value and ledger the difference. The
+    UPDATE is guarded on the balance the difference was computed from, and
+    retried if another request moved it in between, so the entry is exact.
+    """
+    balance = getattr(Account, column)
+    while True:
+        current = db.session.query(balance).filter(Account.user_id == user_id).scalar()
+        if current is None:
+            return False
+        if Account.query.filter(Account.user_id == user_id, balance == current).update(
+            {balance: value}, synchronize_session='fetch'
+        ) == 1:
+            record_ledger(user_id, kind, None, {column: value - current})
+            return True
+
+@db.event.listens_for(Account, 'after_insert')
+def record_opening_balances(mapper, connection, account):
+    """Ledger the starting values of a new account (e.g. the demo balance) so replays start from zero."""
+    rows = [
+        {'user_id': account.user_id, 'field': field, 'amount': getattr(account, field),
+         'kind': 'opening', 'reference': None, 'created_at': datetime.utcnow()}
+        for field in LEDGER_FIELDS if getattr(account, field)
+    ]
+    if rows:
+        connection.execute(LedgerEntry.__table__.insert(), rows)
+
+def latest_snapshots():
+    """Subquery mapping each user_id to the id of their most recent BalanceSnapshot."""
+    return db.select(
+        BalanceSnapshot.user_id, db.func.max(BalanceSnapshot.id).label('snapshot_id')
+    ).group_by(BalanceSnapshot.user_id).subquery()
+
+def ledger_since_snapshot(*columns):
+    """Select columns over the ledger entries newer than their user's latest snapshot."""
+    latest = latest_snapshots()
+    return (
+        db.select(*columns)
+        .select_from(LedgerEntry)
+        .outerjoin(latest, latest.c.user_id == LedgerEntry.user_id)
+        .outerjoin(BalanceSnapshot, BalanceSnapshot.id == latest.c.snapshot_id)
+        .where(LedgerEntry.id > db.func.coalesce(BalanceSnapshot.ledger_id, 0))
+    )
+
+def snapshot_balances(min_entries=1):
+    """
+    Snapshot every account with at least min_entries ledger entries since its
+    last snapshot, with one INSERT ... SELECT so each snapshot and the ledger
+    id it covers are read consistently. Returns the number of snapshots taken.
+    """
+    pending = (
+        ledger_since_snapshot(LedgerEntry.user_id, db.func.max(LedgerEntry.id).label('ledger_id'))
+        .group_by(LedgerEntry.user_id)
+        .having(db.func.count(LedgerEntry.id) >= min_entries)
+        .subquery()
+    )
+    return db.session.execute(
+        BalanceSnapshot.__table__.insert().from_select(
+            ['user_id', 'ledger_id', *LEDGER_FIELDS, 'created_at'],
+            db.select(
+                Account.user_id,
+                pending.c.ledger_id,
+                *(db.func.coalesce(getattr(Account, field), 0.0) for field in LEDGER_FIELDS),
+                db.literal(datetime.utcnow())
+            ).join(pending, pending.c.user_id == Account.user_id)
+        )
+    ).rowcount
+
+def snapshot_unledgered_accounts():
+    """
+    Accounts that predate the ledger carry balances with no entries behind
+    them. Give each a baseline snapshot (ledger_id 0) so audits start there.
+    """
+    return db.session.execute(
+        BalanceSnapshot.__table__.insert().from_select(
+            ['user_id', 'ledger_id', *LEDGER_FIELDS, 'created_at'],
+            db.select(
+                Account.user_id,
+                db.literal(0),
+                *(db.func.coalesce(getattr(Account, field), 0.0) for field in LEDGER_FIELDS),
+                db.literal(datetime.utcnow())
+            ).where(
+                ~db.exists().where(LedgerEntry.user_id == Account.user_id),
+                ~db.exists().where(BalanceSnapshot.user_id == Account.user_id)
+            )
+        )
+    ).rowcount
+
+def balance_at(user_id, at):
+    """
+    Account values as of a point in time: the latest snapshot taken by then
+    plus the ledger entries after it. Returns (values, snapshot or None).
+    """
+    snapshot = BalanceSnapshot.query.filter(
+        BalanceSnapshot.user_id == user_id, BalanceSnapshot.created_at <= at
+    ).order_by(BalanceSnapshot.id.desc()).first()
+    values = {field: getattr(snapshot, field) for field in LEDGER_FIELDS} if snapshot else dict.fromkeys(LEDGER_FIELDS, 0.0)
+    
+    rows = db.session.query(LedgerEntry.field, db.func.sum(LedgerEntry.amount)).filter(
+        LedgerEntry.user_id == user_id,
+        LedgerEntry.id > (snapshot.ledger_id if snapshot else 0),
+        LedgerEntry.created_at <= at
+    ).group_by(LedgerEntry.field)
+    for field, amount in rows:
+        values[field] += amount
+    return values, snapshot
+
+def verify_ledger(tolerance=1e-6, batch_size=1000):
+    """
+    Compare every Account with its latest snapshot plus the ledger entries
+    since, merging two user_id-ordered streams so memory stays flat. Yields
+    (user_id, field, expected, actual) for each mismatch; actual is None for
+    ledger entries whose account no longer exists.
+    """
+    latest = latest_snapshots()
+    accounts = db.session.execute(
+        db.select(
+            Account.user_id,
+            *(getattr(Account, field) for field in LEDGER_FIELDS),
+            *(getattr(BalanceSnapshot, field) for field in LEDGER_FIELDS)
+        )
+        .outerjoin(latest, latest.c.user_id == Account.user_id)
+        .outerjoin(BalanceSnapshot, BalanceSnapshot.id == latest.c.snapshot_id)
+        .order_by(Account.user_id)
+        .execution_options(yield_per=batch_size)
+    )
+    sums = iter(db.session.execute(
+        ledger_since_snapshot(LedgerEntry.user_id, LedgerEntry.field, db.func.sum(LedgerEntry.amount))
+        .group_by(LedgerEntry.user_id, LedgerEntry.field)
+        .order_by(LedgerEntry.user_id)
+        .execution_options(yield_per=batch_size)
+    ))
+    
+    width = len(LEDGER_FIELDS)
+    pending = next(sums, None)
+    for row in accounts:
+        user_id = row[0]
+        expected = {field: row[1 + width + i] or 0.0 for i, field in enumerate(LEDGER_FIELDS)}
+        while pending is not None and pending[0] <= user_id:
+            if pending[0] == user_id:
+                expected[pending[1]] += pending[2]
+            else:
+                yield pending[0], pending[1], pending[2], None
+            pending = next(sums, None)
+        
+        for i, field in enumerate(LEDGER_FIELDS):
+            actual = row[1 + i] or 0.0
+            if abs(actual - expected[field]) > tolerance:
+                yield user_id, field, expected[field], actual
+    
+    while pending is not None:
+        yield pending[0], pending[1], pending[2], None
+        pending = next(sums, None)
+
+def claim_transaction(transaction, status):
+    """
+    Move a pending transaction to status, guarded on it still being pending,
+    so two admins processing the same request cannot both apply it.
+    """
+    values = {'status': status}
+    if status == 'completed':
+        values['completed_at'] = datetime.utcnow()
+    touch_user_data(transaction.user_id)
+    return Transaction.query.filter_by(id=transaction.id, status='pending').update(
+        values, synchronize_session='fetch'
+    ) == 1
+
 @app.route('/api/withdraw', methods=['POST'])
 @login_required
 def create_withdrawal():
     data = request.get_json()
-    amount = data.get('amount', 0)
+    amount = parse_amount(data.get('amount'))
+    if amount is None:
+        return jsonify({'success': False, 'message': 'Invalid amount'}), 400
     
-    if current_user.account.balance < amount:
+    if not current_user.account or current_user.account.balance < amount:
         return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
     
     transaction = Transaction(
@@ -517,18 +1067,22 @@ def create_withdrawal():
 @login_required
 def create_transfer():
     data = request.get_json()
-    amount = data.get('amount', 0)
+    amount = parse_amount(data.get('amount'))
     recipient_username = data.get('recipient')
     
-    if current_user.account.balance < amount:
-        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
+    if amount is None:
+        return jsonify({'success': False, 'message': 'Invalid amount'}), 400
     
     recipient = User.query.filter_by(username=recipient_username).first()
     if not recipient:
         return jsonify({'success': False, 'message': 'Recipient not found'}), 404
     
-    current_user.account.balance -= amount
-    recipient.account.balance += amount
+    reference = f"TRF{secrets.token_hex(6).upper()}"
+    if not debit_account(current_user.id, amount, 'transfer', reference):
+        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
+    if not credit_account(recipient.id, amount, 'transfer', reference):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Recipient account not found'}), 404
     
     sender_tx = Transaction(
         user_id=current_user.id,
@@ -536,7 +1090,7 @@ def create_transfer():
         amount=-amount,
         status='completed',
         description=f"Transfer to {recipient_username}",
-        reference=f"TRF{secrets.token_hex(6).upper()}",
+        reference=reference,
         completed_at=datetime.utcnow()
     )
     
@@ -558,33 +1112,21 @@ def create_transfer():
 @app.route('/api/investments', methods=['GET'])
 @login_required
 def get_investments():
-    investments = Investment.query.filter_by(user_id=current_user.id).order_by(Investment.start_date.desc()).all()
+    investments = db.session.query(*serializers.INVESTMENT.columns).filter(
+        Investment.user_id == current_user.id
+    ).order_by(Investment.start_date.desc()).all()
     
     return jsonify({
-        'investments': [{
-            'id': i.id,
-            'plan_name': i.plan_name,
-            'plan_type': i.plan_type,
-            'amount': i.amount,
-            'expected_return': i.expected_return,
-            'actual_return': i.actual_return,
-            'duration_days': i.duration_days,
-            'status': i.status,
-            'start_date': i.start_date.isoformat(),
-            'end_date': i.end_date.isoformat() if i.end_date else None
-        } for i in investments]
+        'investments': serializers.INVESTMENT.rows(investments)
     })
 
 @app.route('/api/investments', methods=['POST'])
 @login_required
 def create_investment():
     data = request.get_json()
-    amount = data.get('amount', 0)
-    
-    if current_user.account.balance < amount:
-        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
-    
-    current_user.account.balance -= amount
+    amount = parse_amount(data.get('amount'))
+    if amount is None:
+        return jsonify({'success': False, 'message': 'Invalid amount'}), 400
     
     duration_days = data.get('duration_days', 30)
     expected_return = amount * (1 + (data.get('roi', 10) / 100))
@@ -599,6 +1141,11 @@ def create_investment():
         end_date=datetime.utcnow() + timedelta(days=duration_days)
     )
     db.session.add(investment)
+    db.session.flush()
+    
+    if not debit_account(current_user.id, amount, 'investment', f'investment:{investment.id}'):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
     db.session.commit()
     
     return jsonify({
@@ -607,33 +1154,197 @@ def create_investment():
         'investment_id': investment.id
     })
 
+SUMMARY_COLUMNS = ('open_trades', 'open_amount', 'closed_trades', 'wins', 'total_profit', 'total_loss')
+
+def summarize_trades(user_id=None, *criteria):
+    """
+    Recompute trading summary figures from the Trade table, grouped by
+    (user_id, is_demo). This is the source of truth the TradingSummary rows
+    are maintained against. Extra criteria narrow it to a subset of trades.
+    """
+    is_open = Trade.status == 'open'
+    is_closed = Trade.status == 'closed'
+    is_win = db.and_(is_closed, Trade.profit_loss > 0)
+    is_loss = db.and_(is_closed, Trade.profit_loss < 0)
+    query = db.session.query(
+        Trade.user_id,
+        Trade.is_demo,
+        db.func.sum(db.case((is_open, 1), else_=0)),
+        db.func.sum(db.case((is_open, Trade.amount), else_=0)),
+        db.func.sum(db.case((is_closed, 1), else_=0)),
+        db.func.sum(db.case((is_win, 1), else_=0)),
+        db.func.sum(db.case((is_win, Trade.profit_loss), else_=0)),
+        db.func.sum(db.case((is_loss, -Trade.profit_loss), else_=0))
+    )
+    if user_id is not None:
+        query = query.filter(Trade.user_id == user_id)
+    if criteria:
+        query = query.filter(*criteria)
+    
+    summaries = {}
+    for row in query.group_by(Trade.user_id, Trade.is_demo):
+        summaries[(row[0], bool(row[1]))] = dict(zip(SUMMARY_COLUMNS, (v or 0 for v in row[2:])))
+    return summaries
+
+def rebuild_trading_summaries(user_id=None):
+    """Replace the stored summaries (for one user or everyone) with recomputed ones."""
+    db.session.flush()
+    summaries = summarize_trades(user_id)
+    if user_id is not None:
+        for is_demo in (True, False):
+            summaries.setdefault((user_id, is_demo), dict.fromkeys(SUMMARY_COLUMNS, 0))
+    
+    existing = TradingSummary.query
+    if user_id is not None:
+        existing = existing.filter_by(user_id=user_id)
+    existing.delete(synchronize_session=False)
+    
+    db.session.add_all([
+        TradingSummary(user_id=uid, is_demo=is_demo, **values)
+        for (uid, is_demo), values in summaries.items()
+    ])
+    db.session.flush()
+    return summaries
+
+def insert_trade_summary(user_id, is_demo):
+    """
+    Insert a user's missing summary row for one mode, computed from the Trade
+    table, which already reflects the caller's pending changes after the
+    flush. Uses ON CONFLICT DO NOTHING, so a concurrent transaction inserting
+    the same row first is not an error: returns False in that case.
+    """
+    db.session.flush()
+    values = summarize_trades(user_id).get((user_id, is_demo)) or dict.fromkeys(SUMMARY_COLUMNS, 0)
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(TradingSummary.__table__).values(user_id=user_id, is_demo=is_demo, **values)
+    return db.session.execute(statement.on_conflict_do_nothing()).rowcount == 1
+
+def apply_trade_summary(user_id, is_demo, **deltas):
+    """
+    Increment a user's summary row in place inside the caller's transaction.
+    A missing row (user predates the table or was not created at signup) is
+    inserted from the Trade table instead; if another transaction inserted
+    it first, the increments are applied to that row.
+    """
+    touch_user_data(user_id)
+    summary = TradingSummary.query.filter_by(user_id=user_id, is_demo=is_demo)
+    increments = {getattr(TradingSummary, name): getattr(TradingSummary, name) + value for name, value in deltas.items()}
+    if not summary.update(increments, synchronize_session=False) and not insert_trade_summary(user_id, is_demo):
+        summary.update(increments, synchronize_session=False)
+
+def closed_trade_deltas(profit_loss, sign=1):
+    """Summary deltas for adding (sign=1) or removing (sign=-1) a closed trade."""
+    profit_loss = profit_loss or 0.0
+    return {
+        'closed_trades': sign,
+        'wins': sign if profit_loss > 0 else 0,
+        'total_profit': sign * profit_loss if profit_loss > 0 else 0.0,
+        'total_loss': sign * -profit_loss if profit_loss < 0 else 0.0
+    }
+
+def claim_trade_close(trade, exit_price, profit_loss):
+    """
+    Close an open trade, guarded on it still being open, so a second close or
+    the expiry settler (which claims trades as 'settling') cannot settle it
+    again. Returns False if someone else got there first.
+    """
+    touch_user_data(trade.user_id)
+    return Trade.query.filter_by(id=trade.id, status='open').update({
+        'exit_price': exit_price,
+        'profit_loss': profit_loss,
+        'status': 'closed',
+        'closed_at': datetime.utcnow()
+    }, synchronize_session='fetch') == 1
+
+def delete_trades_where(user_id, *criteria):
+    """
+    Delete a user's trades matching criteria with one DELETE statement, in the
+    caller's transaction. Open trades are never matched. Summary counters are
+    reduced by the aggregate of the deleted closed trades, taken before the
+    DELETE and applied after it so a missing summary row rebuilds correctly.
+    """
+    criteria = (Trade.user_id == user_id, Trade.status != 'open') + criteria
+    touch_user_data(user_id)
+    
+    removed = summarize_trades(user_id, *criteria)
+    deleted = Trade.query.filter(*criteria).delete(synchronize_session=False)
+    
+    for (_, is_demo), values in removed.items():
+        if values['closed_trades']:
+            apply_trade_summary(user_id, is_demo, **{
+                name: -values[name] for name in ('closed_trades', 'wins', 'total_profit', 'total_loss')
+            })
+    
+    return deleted
+
+def get_trading_summaries(user_id):
+    """
+    Return {is_demo: TradingSummary} for a user. Only called from read
+    handlers, so nothing is written here: a missing row (a user who has not
+    traded since signing up) is computed from the Trade table and returned
+    unsaved. apply_trade_summary() stores it on the user's next trade.
+    """
+    rows = {s.is_demo: s for s in TradingSummary.query.filter_by(user_id=user_id)}
+    if len(rows) < 2:
+        summaries = summarize_trades(user_id)
+        for is_demo in (True, False):
+            if is_demo not in rows:
+                values = summaries.get((user_id, is_demo), dict.fromkeys(SUMMARY_COLUMNS, 0))
+                rows[is_demo] = TradingSummary(user_id=user_id, is_demo=is_demo, **values)
+    return rows
+
+def backfill_trading_summaries():
+    """
+    Store the summary rows missing for users who predate the table, so reads
+    do not recompute them. Run at startup; if another worker inserts them
+    first, its rows are kept.
+    """
+    missing = db.session.query(User.id).filter(
+        db.select(db.func.count(TradingSummary.id)).where(TradingSummary.user_id == User.id).scalar_subquery() < 2
+    ).all()
+    if not missing:
+        return 0
+    user_ids = [row.id for row in missing]
+    existing = set(db.session.query(TradingSummary.user_id, TradingSummary.is_demo).filter(TradingSummary.user_id.in_(user_ids)))
+    summaries = summarize_trades(None, Trade.user_id.in_(user_ids))
+    db.session.add_all([
+        TradingSummary(user_id=user_id, is_demo=is_demo,
+                       **summaries.get((user_id, is_demo), dict.fromkeys(SUMMARY_COLUMNS, 0)))
+        for user_id in user_ids for is_demo in (True, False)
+        if (user_id, is_demo) not in existing
+    ])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return 0
+    return len(user_ids)
+
 @app.route('/api/trades', methods=['GET'])
 @login_required
+@user_etag()
 def get_trades():
     is_demo = request.args.get('demo', 'false').lower() == 'true'
     status = request.args.get('status')
     
-    query = Trade.query.filter_by(user_id=current_user.id, is_demo=is_demo)
+    query = db.session.query(*serializers.TRADE.columns).filter(Trade.user_id == current_user.id, Trade.is_demo == is_demo)
     if status:
-        query = query.filter_by(status=status)
+        query = query.filter(Trade.status == status)
     
-    trades = query.order_by(Trade.created_at.desc()).all()
+    if 'cursor' in request.args:
+        try:
+            trades, next_cursor, total = keyset_page(query, Trade.created_at, Trade.id)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+        pagination = {'next_cursor': next_cursor, 'total': total}
+    else:
+        trades = query.order_by(Trade.created_at.desc()).all()
+        pagination = {}
     
     return jsonify({
         'success': True,
-        'trades': [{
-            'id': t.id,
-            'symbol': t.symbol,
-            'trade_type': t.trade_type,
-            'amount': t.amount,
-            'entry_price': t.entry_price,
-            'exit_price': t.exit_price,
-            'profit_loss': t.profit_loss,
-            'leverage': t.leverage,
-            'status': t.status,
-            'created_at': t.created_at.isoformat(),
-            'closed_at': t.closed_at.isoformat() if t.closed_at else None
-        } for t in trades]
+        'trades': serializers.TRADE.rows(trades),
+        **pagination
     })
 
 @app.route('/api/trades', methods=['POST'])
@@ -641,31 +1352,22 @@ def get_trades():
 def create_trade():
     data = request.get_json()
     is_demo = data.get('is_demo', False)
-    amount = float(data.get('amount', 0))
+    amount = parse_amount(data.get('amount'))
     symbol = data.get('symbol', 'Unknown')
+    
+    if amount is None:
+        return jsonify({'success': False, 'message': 'Invalid amount'}), 400
     entry_price = data.get('entry_price')
     
     # Ensure entry_price is a valid number, default to 1.0 if not provided
     if entry_price is None or entry_price == '' or entry_price == 0:
-        # Provide realistic default prices based on asset
-        default_prices = {
-            'BTC/USD': 97500, 'ETH/USD': 3450, 'SOL/USD': 220, 'BNB/USD': 710,
-            'XRP/USD': 2.35, 'DOGE/USD': 0.42, 'ADA/USD': 1.05, 'EUR/USD': 1.052,
-            'GBP/USD': 1.265, 'XAU/USD': 2650, 'AAPL': 248, 'TSLA': 420
-        }
-        entry_price = default_prices.get(symbol, 100.0)
+        # Use the last cached market quote (never an upstream call here),
+        # falling back to static reference prices
+        quote = market_data.cached_quotes([symbol]).get(normalize_symbol(symbol))
+        entry_price = quote['price'] if quote else FIXTURE_PRICES.get(normalize_symbol(symbol), 100.0)
     else:
         entry_price = float(entry_price)
     
-    if is_demo:
-        if current_user.account.demo_balance < amount:
-            return jsonify({'success': False, 'message': 'Insufficient demo balance'}), 400
-        current_user.account.demo_balance -= amount
-    else:
-        if current_user.account.balance < amount:
-            return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
-        current_user.account.balance -= amount
-    
     trade = Trade(
         user_id=current_user.id,
         symbol=symbol,
@@ -676,6 +1378,17 @@ def create_trade():
         is_demo=is_demo
     )
     db.session.add(trade)
+    db.session.flush()
+    
+    if is_demo:
+        if not debit_account(current_user.id, amount, 'trade_open', f'trade:{trade.id}', 'demo_balance'):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Insufficient demo balance'}), 400
+    else:
+        if not debit_account(current_user.id, amount, 'trade_open', f'trade:{trade.id}'):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
+    apply_trade_summary(current_user.id, bool(is_demo), open_trades=1, open_amount=amount)
     
     account_type = 'Demo' if is_demo else 'Live'
     notification = Notification(
@@ -686,6 +1399,7 @@ def create_trade():
     )
     db.session.add(notification)
     db.session.commit()
+    publish_trade_event('opened', trade)
     
     return jsonify({
         'success': True,
@@ -741,6 +1455,292 @@ def get_applicable_trade_rule(symbol):
     
     return None
 
+FIXTURE_PRICES = {
+    'BTC/USD': 97500, 'ETH/USD': 3450, 'SOL/USD': 220, 'BNB/USD': 710,
+    'XRP/USD': 2.35, 'DOGE/USD': 0.42, 'ADA/USD': 1.05, 'EUR/USD': 1.052,
+    'GBP/USD': 1.265, 'XAU/USD': 2650, 'AAPL': 248, 'TSLA': 420
+}
+
+class QuoteProvider:
+    """
+    Upstream market data source. fetch() takes normalized symbols and returns
+    {symbol: {'price', 'change_24h', 'volume_24h'}} for the symbols it knows;
+    supports() says which those are.
+    """
+    def supports(self, symbol):
+        raise NotImplementedError
+    
+    def fetch(self, symbols):
+        raise NotImplementedError
+
+class FixtureQuoteProvider(QuoteProvider):
+    """Static prices, for offline development and tests."""
+    def __init__(self, prices=None):
+        self.prices = FIXTURE_PRICES if prices is None else prices
+    
+    def supports(self, symbol):
+        return symbol in self.prices
+    
+    def fetch(self, symbols):
+        return {
+            s: {'price': float(self.prices[s]), 'change_24h': 0.0, 'volume_24h': 0.0}
+            for s in symbols if s in self.prices
+        }
+
+class CoinGeckoQuoteProvider(QuoteProvider):
+    URL = 'https://api.coingecko.com/api/v3/simple/price'
+    COIN_IDS = {
+        'BTC': 'bitcoin', 'ETH': 'ethereum', 'SOL': 'solana', 'BNB': 'binancecoin',
+        'XRP': 'ripple', 'DOGE': 'dogecoin', 'ADA': 'cardano', 'USDT': 'tether',
+        'LTC': 'litecoin', 'DOT': 'polkadot', 'TRX': 'tron', 'SHIB': 'shiba-inu',
+        'AVAX': 'avalanche-2', 'LINK': 'chainlink', 'MATIC': 'matic-network'
+    }
+    USD_QUOTES = ('USD', 'USDT', 'USDC')
+    
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+    
+    def supports(self, symbol):
+        base, _, quote = symbol.partition('/')
+        return base in self.COIN_IDS and quote in self.USD_QUOTES
+    
+    def fetch(self, symbols):
+        coin_ids = {}
+        for symbol in symbols:
+            base, _, quote = symbol.partition('/')
+            if base in self.COIN_IDS and quote in self.USD_QUOTES:
+                coin_ids[symbol] = self.COIN_IDS[base]
+        if not coin_ids:
+            return {}
+        
+        query = urlencode({
+            'ids': ','.join(sorted(set(coin_ids.values()))),
+            'vs_currencies': 'usd',
+            'include_24hr_change': 'true',
+            'include_24hr_vol': 'true'
+        })
+        with urlopen(f'{self.URL}?{query}', timeout=self.timeout) as response:
+            data = json.load(response)
+        
+        quotes = {}
+        for symbol, coin_id in coin_ids.items():
+            coin = data.get(coin_id) or {}
+            if 'usd' in coin:
+                quotes[symbol] = {
+                    'price': float(coin['usd']),
+                    'change_24h': coin.get('usd_24h_change') or 0.0,
+                    'volume_24h': coin.get('usd_24h_vol') or 0.0
+                }
+        return quotes
+
+class MarketDataCache:
+    """
+    Process-wide quote cache keyed by normalize_symbol() output.
+    
+    Fresh quotes are served from memory. Stale symbols are refreshed with one
+    provider call, so N concurrent users cost one upstream fetch per TTL.
+    While a refresh is running, callers that have a last known quote for
+    every symbol they asked for get it at once; only the others wait on the
+    refresh and then re-check. Upstream failures are remembered for a TTL as
+    well, serving the last known quote if there is one. Symbols the provider
+    does not support are never looked up or stored, so the cache holds at
+    most the provider's symbol set. cached_quotes() never calls upstream.
+    """
+    def __init__(self, provider, ttl=30):
+        self.provider = provider
+        self.ttl = ttl
+        self._entries = {}
+        self._refresh_lock = threading.Lock()
+    
+    def _stale(self, symbols):
+        now = time.monotonic()
+        return [s for s in symbols if s not in self._entries or now - self._entries[s][0] >= self.ttl]
+    
+    def _supported(self, symbols):
+        normalized = dict.fromkeys(normalize_symbol(s) for s in symbols if s and s.strip())
+        return [s for s in normalized if self.provider.supports(s)]
+    
+    def get_quotes(self, symbols):
+        symbols = self._supported(symbols)
+        
+        stale = self._stale(symbols)
+        if stale and self._refresh_lock.acquire(blocking=any(s not in self._entries for s in stale)):
+            try:
+                stale = self._stale(symbols)
+                if stale:
+                    self._refresh(stale)
+            finally:
+                self._refresh_lock.release()
+        return self.cached_quotes(symbols)
+    
+    def cached_quotes(self, symbols):
+        """The last known quotes, however old, without refreshing anything."""
+        quotes = {}
+        for symbol in dict.fromkeys(normalize_symbol(s) for s in symbols if s and s.strip()):
+            entry = self._entries.get(symbol)
+            if entry and entry[1]:
+                quotes[symbol] = entry[1]
+        return quotes
+    
+    def _refresh(self, symbols):
+        try:
+            fetched = self.provider.fetch(symbols)
+        except Exception as e:
+            app.logger.warning('Market data refresh failed for %s: %s', ','.join(symbols), e)
+            fetched = {}
+        
+        now = time.monotonic()
+        updated_at = datetime.utcnow().isoformat()
+        for symbol in symbols:
+            if symbol in fetched:
+                self._entries[symbol] = (now, dict(fetched[symbol], symbol=symbol, updated_at=updated_at))
+            else:
+                previous = self._entries.get(symbol)
+                self._entries[symbol] = (now, previous[1] if previous else None)
+
+def create_quote_provider():
+    if os.environ.get('MARKET_DATA_PROVIDER', 'coingecko').lower() == 'fixture':
+        return FixtureQuoteProvider()
+    return CoinGeckoQuoteProvider()
+
+market_data = MarketDataCache(create_quote_provider(), ttl=int(os.environ.get('MARKET_DATA_TTL', 30)))
+
+@app.route('/api/market/quotes', methods=['GET'])
+def get_market_quotes():
+    symbols = [s for s in request.args.get('symbols', '').split(',') if s.strip()]
+    if not symbols:
+        return jsonify({'success': False, 'message': 'symbols is required'}), 400
+    if len(symbols) > 50:
+        return jsonify({'success': False, 'message': 'At most 50 symbols per request'}), 400
+    
+    return jsonify({'success': True, 'quotes': market_data.get_quotes(symbols)})
+
+STREAM_TICK_SECONDS = float(os.environ.get('STREAM_TICK_SECONDS', 5))
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_QUEUE_SIZE = 256
+
+class StreamSubscription:
+    def __init__(self, user_id, symbols):
+        self.user_id = user_id
+        self.symbols = symbols
+        self.queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+class EventBroker:
+    """
+    Fans events out to the /api/stream connections of this process.
+    
+    Quote ticks come from one publisher thread per process that reads the
+    shared MarketDataCache for the union of subscribed symbols, so connections
+    never poll the database or upstream themselves. Trade events are published
+    by the write handlers after commit and delivered only to that user's
+    connections. A subscriber that stops reading has events dropped rather
+    than blocking the publisher.
+    
+    Delivery is per process: under gunicorn, trade events reach connections
+    held by the worker that handled the write, so run the stream with a
+    single threaded worker (-k gthread -w 1 --threads N).
+    """
+    def __init__(self, tick_seconds):
+        self.tick_seconds = tick_seconds
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ticker = None
+    
+    def subscribe(self, user_id, symbols):
+        subscription = StreamSubscription(user_id, symbols)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._ticker is None or not self._ticker.is_alive():
+                self._ticker = threading.Thread(target=self._run_ticker, name='stream-ticker', daemon=True)
+                self._ticker.start()
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+    
+    def subscriber_count(self):
+        return len(self._subscriptions)
+    
+    def publish(self, event, data, user_id=None):
+        with self._lock:
+            targets = [s for s in self._subscriptions if user_id is None or s.user_id == user_id]
+        for subscription in targets:
+            self._deliver(subscription, event, data)
+    
+    def _deliver(self, subscription, event, data):
+        try:
+            subscription.queue.put_nowait((event, data))
+        except queue.Full:
+            pass
+    
+    def _run_ticker(self):
+        while True:
+            time.sleep(self.tick_seconds)
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+            symbols = set()
+            for subscription in subscriptions:
+                symbols.update(subscription.symbols)
+            if not symbols:
+                continue
+            
+            quotes = market_data.get_quotes(sorted(symbols))
+            ts = time.time()
+            for subscription in subscriptions:
+                subset = {s: quotes[s] for s in subscription.symbols if s in quotes}
+                if subset:
+                    self._deliver(subscription, 'quote', {'quotes': subset, 'ts': ts})
+
+event_broker = EventBroker(STREAM_TICK_SECONDS)
+
+def publish_trade_event(state, trade):
+    event_broker.publish('trade', {
+        'state': state,
+        'id': trade.id,
+        'symbol': trade.symbol,
+        'trade_type': trade.trade_type,
+        'is_demo': bool(trade.is_demo),
+        'amount': trade.amount,
+        'entry_price': trade.entry_price,
+        'exit_price': trade.exit_price,
+        'profit_loss': trade.profit_loss,
+        'status': trade.status
+    }, user_id=trade.user_id)
+
+@app.route('/api/stream', methods=['GET'])
+@login_required
+def stream_events():
+    # A stream holds its worker for as long as the page is open; on gunicorn's
+    # sync worker that would stall every other request, so refuse and let the
+    # page poll instead
+    if not request.environ.get('wsgi.multithread'):
+        return jsonify({'success': False, 'message': 'Streaming needs a threaded or async worker'}), 503
+    
+    symbols = [normalize_symbol(s) for s in request.args.get('symbols', '').split(',') if s.strip()][:50]
+    subscription = event_broker.subscribe(current_user.id, symbols)
+    snapshot = market_data.get_quotes(symbols) if symbols else {}
+    
+    def generate():
+        try:
+            yield f'retry: {STREAM_HEARTBEAT_SECONDS * 1000}\n\n'
+            if snapshot:
+                yield f'event: quote\ndata: {json.dumps({"quotes": snapshot, "ts": time.time()})}\n\n'
+            while True:
+                try:
+                    event, data = subscription.queue.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+        finally:
+            event_broker.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/trades/<int:trade_id>/close', methods=['POST'])
 @login_required
 def close_trade(trade_id):
@@ -752,8 +1752,10 @@ def close_trade(trade_id):
     if trade.status != 'open':
         return jsonify({'success': False, 'message': 'Trade is not open'}), 400
     
-    data = request.get_json()
-    exit_price = data.get('exit_price', trade.entry_price)
+    data = request.get_json(silent=True) or {}
+    exit_price = parse_amount(data.get('exit_price', trade.entry_price))
+    if exit_price is None:
+        return jsonify({'success': False, 'message': 'Invalid exit price'}), 400
     
     rule = get_applicable_trade_rule(trade.symbol)
     
@@ -765,19 +1767,18 @@ def close_trade(trade_id):
             price_diff = -price_diff
         profit_loss = (price_diff / trade.entry_price) * trade.amount * trade.leverage
     
-    trade.exit_price = exit_price
-    trade.profit_loss = profit_loss
-    trade.status = 'closed'
-    trade.closed_at = datetime.utcnow()
+    if not claim_trade_close(trade, exit_price, profit_loss):
+        return jsonify({'success': False, 'message': 'Trade is not open'}), 400
     
     return_amount = trade.amount + profit_loss
     if trade.is_demo:
-        current_user.account.demo_balance += return_amount
+        credit_account(current_user.id, return_amount, 'trade_close', f'trade:{trade.id}', 'demo_balance')
     else:
-        current_user.account.balance += return_amount
-        current_user.account.total_profit += profit_loss
+        credit_account(current_user.id, return_amount, 'trade_close', f'trade:{trade.id}', total_profit=profit_loss)
     
+    apply_trade_summary(current_user.id, trade.is_demo, open_trades=-1, open_amount=-trade.amount, **closed_trade_deltas(trade.profit_loss))
     db.session.commit()
+    publish_trade_event('closed', trade)
     
     return jsonify({
         'success': True,
@@ -796,6 +1797,8 @@ def delete_trade(trade_id):
     if trade.status == 'open':
         return jsonify({'success': False, 'message': 'Cannot delete an open trade. Close it first.'}), 400
     
+    if trade.status == 'closed':
+        apply_trade_summary(current_user.id, trade.is_demo, **closed_trade_deltas(trade.profit_loss, sign=-1))
     db.session.delete(trade)
     db.session.commit()
     
@@ -804,24 +1807,68 @@ def delete_trade(trade_id):
         'message': 'Trade deleted successfully'
     })
 
+BULK_DELETE_MAX_IDS = 10000
+
+@app.route('/api/trades/bulk-delete', methods=['POST'])
+@login_required
+def bulk_delete_trades():
+    """
+    Delete many closed/cancelled trades in one transaction. Takes either
+    {"ids": [...]} or filters: is_demo, status ('closed' | 'cancelled') and
+    before (ISO date, compared against the close time, or the open time for
+    cancelled trades). Open trades are always skipped.
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Request body must be a JSON object'}), 400
+    criteria = []
+    
+    ids = data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({'success': False, 'message': 'ids must be a list of trade ids'}), 400
+        if len(ids) > BULK_DELETE_MAX_IDS:
+            return jsonify({'success': False, 'message': f'At most {BULK_DELETE_MAX_IDS} ids per request'}), 400
+        criteria.append(Trade.id.in_(set(ids)))
+    
+    if data.get('is_demo') is not None:
+        if not isinstance(data['is_demo'], bool):
+            return jsonify({'success': False, 'message': 'is_demo must be true or false'}), 400
+        criteria.append(Trade.is_demo == data['is_demo'])
+    
+    status = data.get('status')
+    if status is not None:
+        if status not in ('closed', 'cancelled'):
+            return jsonify({'success': False, 'message': 'status must be closed or cancelled'}), 400
+        criteria.append(Trade.status == status)
+    
+    if data.get('before'):
+        try:
+            before = datetime.fromisoformat(str(data['before']))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid before date'}), 400
+        criteria.append(db.func.coalesce(Trade.closed_at, Trade.created_at) < before)
+    
+    if not criteria:
+        return jsonify({'success': False, 'message': 'Provide ids or at least one filter'}), 400
+    
+    deleted = delete_trades_where(current_user.id, *criteria)
+    db.session.commit()
+    
+    response = {'success': True, 'message': f'{deleted} trade(s) deleted', 'deleted': deleted}
+    if ids is not None:
+        response['skipped'] = len(set(ids)) - deleted
+    return jsonify(response)
+
 @app.route('/api/loans', methods=['GET'])
 @login_required
 def get_loans():
-    loans = Loan.query.filter_by(user_id=current_user.id).order_by(Loan.created_at.desc()).all()
+    loans = db.session.query(*serializers.LOAN.columns).filter(
+        Loan.user_id == current_user.id
+    ).order_by(Loan.created_at.desc()).all()
     
     return jsonify({
-        'loans': [{
-            'id': l.id,
-            'amount': l.amount,
-            'interest_rate': l.interest_rate,
-            'duration_months': l.duration_months,
-            'monthly_payment': l.monthly_payment,
-            'total_repayment': l.total_repayment,
-            'amount_paid': l.amount_paid,
-            'status': l.status,
-            'purpose': l.purpose,
-            'created_at': l.created_at.isoformat()
-        } for l in loans]
+        'loans': serializers.LOAN.rows(loans)
     })
 
 @app.route('/api/loans', methods=['POST'])
@@ -857,30 +1904,19 @@ def create_loan():
 @app.route('/api/copy-trading', methods=['GET'])
 @login_required
 def get_copy_trading():
-    copies = CopyTrading.query.filter_by(user_id=current_user.id).all()
+    copies = db.session.query(*serializers.COPY_TRADING.columns).filter(CopyTrading.user_id == current_user.id).all()
     
     return jsonify({
-        'copy_trading': [{
-            'id': c.id,
-            'trader_name': c.trader_name,
-            'amount_allocated': c.amount_allocated,
-            'profit_share': c.profit_share,
-            'total_profit': c.total_profit,
-            'status': c.status,
-            'created_at': c.created_at.isoformat()
-        } for c in copies]
+        'copy_trading': serializers.COPY_TRADING.rows(copies)
     })
 
 @app.route('/api/copy-trading', methods=['POST'])
 @login_required
 def start_copy_trading():
     data = request.get_json()
-    amount = data.get('amount', 0)
-    
-    if current_user.account.balance < amount:
-        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
-    
-    current_user.account.balance -= amount
+    amount = parse_amount(data.get('amount'))
+    if amount is None:
+        return jsonify({'success': False, 'message': 'Invalid amount'}), 400
     
     copy = CopyTrading(
         user_id=current_user.id,
@@ -889,6 +1925,11 @@ def start_copy_trading():
         profit_share=data.get('profit_share', 20.0)
     )
     db.session.add(copy)
+    db.session.flush()
+    
+    if not debit_account(current_user.id, amount, 'copy_trading', f'copy_trading:{copy.id}'):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
     db.session.commit()
     
     return jsonify({
@@ -900,32 +1941,19 @@ def start_copy_trading():
 @app.route('/api/bot-trading', methods=['GET'])
 @login_required
 def get_bot_trading():
-    bots = BotTrading.query.filter_by(user_id=current_user.id).all()
+    bots = db.session.query(*serializers.BOT_TRADING.columns).filter(BotTrading.user_id == current_user.id).all()
     
     return jsonify({
-        'bots': [{
-            'id': b.id,
-            'bot_name': b.bot_name,
-            'strategy': b.strategy,
-            'amount_allocated': b.amount_allocated,
-            'total_profit': b.total_profit,
-            'trades_executed': b.trades_executed,
-            'win_rate': b.win_rate,
-            'status': b.status,
-            'created_at': b.created_at.isoformat()
-        } for b in bots]
+        'bots': serializers.BOT_TRADING.rows(bots)
     })
 
 @app.route('/api/bot-trading', methods=['POST'])
 @login_required
 def start_bot_trading():
     data = request.get_json()
-    amount = data.get('amount', 0)
-    
-    if current_user.account.balance < amount:
-        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
-    
-    current_user.account.balance -= amount
+    amount = parse_amount(data.get('amount'))
+    if amount is None:
+        return jsonify({'success': False, 'message': 'Invalid amount'}), 400
     
     bot = BotTrading(
         user_id=current_user.id,
@@ -934,6 +1962,11 @@ def start_bot_trading():
         amount_allocated=amount
     )
     db.session.add(bot)
+    db.session.flush()
+    
+    if not debit_account(current_user.id, amount, 'bot_trading', f'bot_trading:{bot.id}'):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Insufficient balance'}), 400
     db.session.commit()
     
     return jsonify({
@@ -945,19 +1978,12 @@ def start_bot_trading():
 @app.route('/api/support', methods=['GET'])
 @login_required
 def get_support_tickets():
-    tickets = SupportTicket.query.filter_by(user_id=current_user.id).order_by(SupportTicket.created_at.desc()).all()
+    tickets = db.session.query(*serializers.SUPPORT_TICKET.columns).filter(
+        SupportTicket.user_id == current_user.id
+    ).order_by(SupportTicket.created_at.desc()).all()
     
     return jsonify({
-        'tickets': [{
-            'id': t.id,
-            'subject': t.subject,
-            'message': t.message,
-            'priority': t.priority,
-            'status': t.status,
-            'response': t.response,
-            'created_at': t.created_at.isoformat(),
-            'resolved_at': t.resolved_at.isoformat() if t.resolved_at else None
-        } for t in tickets]
+        'tickets': serializers.SUPPORT_TICKET.rows(tickets)
     })
 
 @app.route('/api/support', methods=['POST'])
@@ -994,34 +2020,15 @@ def get_referral():
 
 @app.route('/api/notifications', methods=['GET'])
 @login_required
+@user_etag(period=60)
 def get_notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).limit(20).all()
-    
-    def time_ago(dt):
-        now = datetime.utcnow()
-        diff = now - dt
-        if diff.days > 0:
-            return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
-        elif diff.seconds >= 3600:
-            hours = diff.seconds // 3600
-            return f"{hours} hour{'s' if hours > 1 else ''} ago"
-        elif diff.seconds >= 60:
-            minutes = diff.seconds // 60
-            return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-        else:
-            return "Just now"
+    notifications = db.session.query(*serializers.NOTIFICATION.columns).filter(
+        Notification.user_id == current_user.id
+    ).order_by(Notification.created_at.desc()).limit(20).all()
     
     return jsonify({
         'success': True,
-        'notifications': [{
-            'id': n.id,
-            'title': n.title,
-            'message': n.message,
-            'type': n.type,
-            'read': n.read,
-            'created_at': n.created_at.isoformat(),
-            'time_ago': time_ago(n.created_at)
-        } for n in notifications]
+        'notifications': serializers.NOTIFICATION.rows(notifications)
     })
 
 @app.route('/api/notifications/<int:notification_id>/read', methods=['POST'])
@@ -1036,22 +2043,22 @@ def mark_notification_read(notification_id):
 @app.route('/api/demo/balance', methods=['GET'])
 @login_required
 def get_demo_balance():
-    account = Account.query.filter_by(user_id=current_user.id).first()
+    account = current_user.account
     if not account:
-        account = Account(user_id=current_user.id, demo_balance=10000.0)
-        db.session.add(account)
+        account = current_user.account = Account(user_id=current_user.id, demo_balance=10000.0)
         db.session.commit()
     
-    open_trades = Trade.query.filter_by(user_id=current_user.id, is_demo=True, status='open').all()
-    open_trades_value = sum(t.amount for t in open_trades)
+    summary = get_trading_summaries(current_user.id)[True]
     
     return jsonify({
         'success': True,
         'demo_balance': account.demo_balance,
-        'open_trades_count': len(open_trades),
-        'open_trades_value': open_trades_value
+        'open_trades_count': summary.open_trades,
+        'open_trades_value': summary.open_amount
     })
 
+DEMO_MAX_EXPIRY_SECONDS = 86400
+
 @app.route('/api/demo/trade', methods=['POST'])
 @login_required
 def place_demo_trade():
@@ -1062,22 +2069,21 @@ def place_demo_trade():
     amount = float(data.get('amount', 0))
     entry_price = float(data.get('entry_price', 0))
     leverage = int(data.get('leverage', 1))
-    expiry_seconds = int(data.get('expiry_seconds', 60))
+    try:
+        expiry_seconds = int(data.get('expiry_seconds', 60))
+    except (TypeError, ValueError, OverflowError):
+        expiry_seconds = None
     
     if not symbol or amount <= 0 or entry_price <= 0:
         return jsonify({'success': False, 'message': 'Invalid trade parameters'}), 400
+    if expiry_seconds is None or not 1 <= expiry_seconds <= DEMO_MAX_EXPIRY_SECONDS:
+        return jsonify({'success': False, 'message': f'expiry_seconds must be between 1 and {DEMO_MAX_EXPIRY_SECONDS}'}), 400
     
-    account = Account.query.filter_by(user_id=current_user.id).first()
+    account = current_user.account
     if not account:
-        account = Account(user_id=current_user.id, demo_balance=10000.0)
-        db.session.add(account)
+        account = current_user.account = Account(user_id=current_user.id, demo_balance=10000.0)
         db.session.commit()
     
-    if amount > account.demo_balance:
-        return jsonify({'success': False, 'message': 'Insufficient demo balance'}), 400
-    
-    account.demo_balance -= amount
-    
     trade = Trade(
         user_id=current_user.id,
         symbol=symbol,
@@ -1086,11 +2092,18 @@ def place_demo_trade():
         entry_price=entry_price,
         leverage=leverage,
         status='open',
-        is_demo=True
+        is_demo=True,
+        expires_at=datetime.utcnow() + timedelta(seconds=expiry_seconds)
     )
-    
     db.session.add(trade)
+    db.session.flush()
+    
+    if not debit_account(current_user.id, amount, 'trade_open', f'trade:{trade.id}', 'demo_balance'):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Insufficient demo balance'}), 400
+    apply_trade_summary(current_user.id, True, open_trades=1, open_amount=amount)
     db.session.commit()
+    publish_trade_event('opened', trade)
     
     return jsonify({
         'success': True,
@@ -1100,6 +2113,27 @@ def place_demo_trade():
         'expiry_seconds': expiry_seconds
     })
 
+def demo_trade_profit_loss(trade, exit_price):
+    """Demo P/L: leveraged % move on the stake, capped at +85% / -100%."""
+    price_change_percent = ((exit_price - trade.entry_price) / trade.entry_price) * 100
+    
+    if trade.trade_type == 'sell':
+        price_change_percent = -price_change_percent
+    
+    leveraged_change = price_change_percent * trade.leverage
+    profit_loss = (trade.amount * leveraged_change) / 100
+    
+    if profit_loss > trade.amount:
+        profit_loss = trade.amount * 0.85
+    elif profit_loss < -trade.amount:
+        profit_loss = -trade.amount
+    
+    return profit_loss
+
+def demo_trade_return(amount, profit_loss):
+    final_return = amount + profit_loss
+    return final_return if final_return > 0 else 0.0
+
 @app.route('/api/demo/trade/<int:trade_id>/close', methods=['POST'])
 @login_required
 def close_demo_trade(trade_id):
@@ -1113,31 +2147,17 @@ def close_demo_trade(trade_id):
     if trade.status != 'open':
         return jsonify({'success': False, 'message': 'Trade already closed'}), 400
     
-    account = Account.query.filter_by(user_id=current_user.id).first()
-    
-    price_change_percent = ((exit_price - trade.entry_price) / trade.entry_price) * 100
-    
-    if trade.trade_type == 'sell':
-        price_change_percent = -price_change_percent
-    
-    leveraged_change = price_change_percent * trade.leverage
-    profit_loss = (trade.amount * leveraged_change) / 100
-    
-    if profit_loss > trade.amount:
-        profit_loss = trade.amount * 0.85
-    elif profit_loss < -trade.amount:
-        profit_loss = -trade.amount
+    account = current_user.account
     
-    trade.exit_price = exit_price
-    trade.profit_loss = profit_loss
-    trade.status = 'closed'
-    trade.closed_at = datetime.utcnow()
+    profit_loss = demo_trade_profit_loss(trade, exit_price)
+    if not claim_trade_close(trade, exit_price, profit_loss):
+        return jsonify({'success': False, 'message': 'Trade already closed'}), 400
     
-    final_return = trade.amount + profit_loss
-    if final_return > 0:
-        account.demo_balance += final_return
+    credit_account(current_user.id, demo_trade_return(trade.amount, profit_loss), 'trade_close', f'trade:{trade.id}', 'demo_balance')
     
+    apply_trade_summary(current_user.id, True, open_trades=-1, open_amount=-trade.amount, **closed_trade_deltas(trade.profit_loss))
     db.session.commit()
+    publish_trade_event('closed', trade)
     
     return jsonify({
         'success': True,
@@ -1150,120 +2170,616 @@ def close_demo_trade(trade_id):
 @app.route('/api/demo/trades/open', methods=['GET'])
 @login_required
 def get_open_demo_trades():
-    trades = Trade.query.filter_by(user_id=current_user.id, is_demo=True, status='open').order_by(Trade.created_at.desc()).all()
+    trades = db.session.query(*serializers.OPEN_DEMO_TRADE.columns).filter(
+        Trade.user_id == current_user.id, Trade.is_demo == True, Trade.status == 'open'
+    ).order_by(Trade.created_at.desc()).all()
     
     return jsonify({
         'success': True,
-        'trades': [{
-            'id': t.id,
-            'symbol': t.symbol,
-            'trade_type': t.trade_type,
-            'amount': t.amount,
-            'entry_price': t.entry_price,
-            'leverage': t.leverage,
-            'created_at': t.created_at.isoformat()
-        } for t in trades]
+        'trades': serializers.OPEN_DEMO_TRADE.rows(trades)
     })
 
 @app.route('/api/demo/history', methods=['GET'])
 @login_required
 def get_demo_history():
-    trades = Trade.query.filter_by(user_id=current_user.id, is_demo=True, status='closed').order_by(Trade.closed_at.desc()).limit(50).all()
+    query = db.session.query(*serializers.DEMO_HISTORY_TRADE.columns).filter(
+        Trade.user_id == current_user.id, Trade.is_demo == True, Trade.status == 'closed'
+    )
     
-    total_profit = sum(t.profit_loss for t in trades if t.profit_loss > 0)
-    total_loss = sum(abs(t.profit_loss) for t in trades if t.profit_loss < 0)
-    win_count = sum(1 for t in trades if t.profit_loss > 0)
-    loss_count = sum(1 for t in trades if t.profit_loss <= 0)
+    if 'cursor' in request.args:
+        try:
+            trades, next_cursor, _ = keyset_page(query, Trade.closed_at, Trade.id)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+    else:
+        trades = query.order_by(Trade.closed_at.desc(), Trade.id.desc()).limit(50).all()
+        next_cursor = None
     
     return jsonify({
         'success': True,
-        'trades': [{
-            'id': t.id,
-            'symbol': t.symbol,
-            'trade_type': t.trade_type,
-            'amount': t.amount,
-            'entry_price': t.entry_price,
-            'exit_price': t.exit_price,
-            'profit_loss': t.profit_loss,
-            'leverage': t.leverage,
-            'result': 'win' if t.profit_loss > 0 else 'loss',
-            'created_at': t.created_at.isoformat(),
-            'closed_at': t.closed_at.isoformat() if t.closed_at else None
-        } for t in trades],
-        'stats': {
-            'total_trades': len(trades),
-            'wins': win_count,
-            'losses': loss_count,
-            'total_profit': total_profit,
-            'total_loss': total_loss,
-            'net_pnl': total_profit - total_loss,
-            'win_rate': (win_count / len(trades) * 100) if trades else 0
-        }
+        'trades': serializers.DEMO_HISTORY_TRADE.rows(trades),
+        'next_cursor': next_cursor,
+        'stats': closed_trade_stats(current_user.id, is_demo=True)
     })
 
 @app.route('/api/demo/reset', methods=['POST'])
 @login_required
 def reset_demo_account():
-    account = Account.query.filter_by(user_id=current_user.id).first()
-    if not account:
-        account = Account(user_id=current_user.id)
-        db.session.add(account)
+    data = request.get_json(silent=True) or {}
+    if not current_user.account:
+        current_user.account = Account(user_id=current_user.id)
+    
+    reset_account_balance(current_user.id, 10000.0, 'demo_reset')
+    
+    cancelled = Trade.query.filter_by(user_id=current_user.id, is_demo=True, status='open').update(
+        {'status': 'cancelled'}, synchronize_session=False
+    )
     
-    account.demo_balance = 10000.0
+    deleted = 0
+    if data.get('clear_history'):
+        deleted = delete_trades_where(current_user.id, Trade.is_demo == True)
     
-    Trade.query.filter_by(user_id=current_user.id, is_demo=True, status='open').update({'status': 'cancelled'})
+    summary = TradingSummary.query.filter_by(user_id=current_user.id, is_demo=True)
+    reset = {'open_trades': 0, 'open_amount': 0.0}
+    if not summary.update(reset, synchronize_session=False) and not insert_trade_summary(current_user.id, True):
+        summary.update(reset, synchronize_session=False)
     
     db.session.commit()
+    event_broker.publish('trade', {'state': 'reset', 'is_demo': True}, user_id=current_user.id)
     
     return jsonify({
         'success': True,
         'message': 'Demo account reset successfully',
-        'new_balance': 10000.0
+        'new_balance': 10000.0,
+        'cancelled': cancelled,
+        'deleted': deleted
     })
 
 @app.route('/api/trades/all-history', methods=['GET'])
 @login_required
 def get_all_trade_history():
-    trades = Trade.query.filter_by(user_id=current_user.id, status='closed').order_by(Trade.closed_at.desc()).all()
-    
-    total_profit = sum(t.profit_loss for t in trades if t.profit_loss > 0)
-    total_loss = abs(sum(t.profit_loss for t in trades if t.profit_loss < 0))
-    win_count = sum(1 for t in trades if t.profit_loss > 0)
-    loss_count = sum(1 for t in trades if t.profit_loss <= 0)
+    query = db.session.query(*serializers.HISTORY_TRADE.columns).filter(
+        Trade.user_id == current_user.id, Trade.status == 'closed'
+    )
     
-    demo_trades = [t for t in trades if t.is_demo]
-    live_trades = [t for t in trades if not t.is_demo]
+    if 'cursor' in request.args:
+        try:
+            trades, next_cursor, total = keyset_page(query, Trade.closed_at, Trade.id)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+        pagination = {'next_cursor': next_cursor, 'total': total}
+    else:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        paged = query.order_by(Trade.closed_at.desc(), Trade.id.desc()).paginate(page=page, per_page=per_page)
+        trades = paged.items
+        pagination = {'total': paged.total, 'pages': paged.pages, 'current_page': page}
     
-    return jsonify({
+    response = {
         'success': True,
-        'trades': [{
-            'id': t.id,
-            'symbol': t.symbol,
-            'trade_type': t.trade_type,
-            'amount': t.amount,
-            'entry_price': t.entry_price,
-            'exit_price': t.exit_price,
-            'profit_loss': t.profit_loss,
-            'leverage': t.leverage,
-            'is_demo': t.is_demo,
-            'account_type': 'DEMO' if t.is_demo else 'LIVE',
-            'result': 'win' if t.profit_loss > 0 else 'loss',
-            'created_at': t.created_at.isoformat(),
-            'closed_at': t.closed_at.isoformat() if t.closed_at else None
-        } for t in trades],
-        'stats': {
-            'total_trades': len(trades),
-            'demo_trades': len(demo_trades),
-            'live_trades': len(live_trades),
-            'wins': win_count,
-            'losses': loss_count,
-            'total_profit': total_profit,
-            'total_loss': total_loss,
-            'net_pnl': total_profit - total_loss,
-            'win_rate': (win_count / len(trades) * 100) if trades else 0
-        }
+        'trades': serializers.HISTORY_TRADE.rows(trades),
+        **pagination
+    }
+    # Stats cover the whole history, so cursor walks only need them once.
+    if not request.args.get('cursor'):
+        response['stats'] = closed_trade_stats(current_user.id)
+    
+    return jsonify(response)
+
+def closed_trade_stats(user_id, is_demo=None):
+    """Win/loss statistics over a user's closed trades, read from TradingSummary."""
+    summaries = get_trading_summaries(user_id)
+    if is_demo is not None:
+        summaries = {is_demo: summaries[is_demo]}
+    
+    demo_trades = summaries[True].closed_trades if True in summaries else 0
+    live_trades = summaries[False].closed_trades if False in summaries else 0
+    wins = sum(s.wins for s in summaries.values())
+    total_profit = sum(s.total_profit for s in summaries.values())
+    total_loss = sum(s.total_loss for s in summaries.values())
+    
+    total_trades = demo_trades + live_trades
+    return {
+        'total_trades': total_trades,
+        'demo_trades': demo_trades,
+        'live_trades': live_trades,
+        'wins': wins,
+        'losses': total_trades - wins,
+        'total_profit': total_profit,
+        'total_loss': total_loss,
+        'net_pnl': total_profit - total_loss,
+        'win_rate': (wins / total_trades * 100) if total_trades else 0
+    }
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Spreadsheets run a cell starting with one of these as a formula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+TRANSACTION_EXPORT_COLUMNS = (
+    Transaction.id, Transaction.type, Transaction.amount, Transaction.status, Transaction.payment_method,
+    Transaction.reference, Transaction.crypto_type, Transaction.crypto_network, Transaction.txid,
+    Transaction.description, Transaction.created_at, Transaction.completed_at
+)
+TRADE_EXPORT_COLUMNS = (
+    Trade.id, Trade.symbol, Trade.trade_type, Trade.is_demo, Trade.amount, Trade.entry_price, Trade.exit_price,
+    Trade.profit_loss, Trade.leverage, Trade.status, Trade.created_at, Trade.closed_at
+)
+
+def export_statement(model, columns, user_id=None):
+    """
+    Column-projected SELECT for an export, filtered by the request's
+    ?from= / ?to= (ISO dates or datetimes on created_at; a bare `to` date
+    includes that whole day), ?status=, ?type= (transactions) and
+    ?is_demo= (trades). Raises ValueError on a bad date.
+    """
+    statement = db.select(*columns)
+    if user_id is not None:
+        statement = statement.where(model.user_id == user_id)
+    
+    args = request.args
+    if args.get('from'):
+        statement = statement.where(model.created_at >= datetime.fromisoformat(args['from']))
+    if args.get('to'):
+        end = datetime.fromisoformat(args['to'])
+        if len(args['to']) == 10:
+            end += timedelta(days=1)
+        statement = statement.where(model.created_at < end)
+    if args.get('status'):
+        statement = statement.where(model.status.in_(args['status'].split(',')))
+    if args.get('type') and model is Transaction:
+        statement = statement.where(Transaction.type.in_(args['type'].split(',')))
+    if args.get('is_demo') and model is Trade:
+        statement = statement.where(Trade.is_demo == (args['is_demo'].lower() == 'true'))
+    
+    return statement.order_by(model.created_at, model.id)
+
+def export_response(statement, name):
+    """
+    Stream the statement's rows as CSV (default) or NDJSON (?format=ndjson).
+    Rows are fetched EXPORT_BATCH_SIZE at a time through a server-side cursor
+    and written out batch by batch, so memory stays flat however many rows
+    match.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'Invalid format. Use csv or ndjson'}), 400
+    
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    fields = list(result.keys())
+    
+    def value(v):
+        return v.isoformat() if isinstance(v, datetime) else v
+    
+    def csv_value(v):
+        # User-entered text (descriptions, usernames) is quoted so it stays text
+        if isinstance(v, str) and v.startswith(CSV_FORMULA_PREFIXES):
+            return "'" + v
+        return value(v)
+    
+    def generate():
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if export_format == 'csv':
+                writer.writerow(fields)
+            for partition in result.partitions():
+                for row in partition:
+                    if export_format == 'csv':
+                        writer.writerow([csv_value(v) for v in row])
+                    else:
+                        buffer.write(json.dumps(dict(zip(fields, map(value, row)))))
+                        buffer.write('\n')
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            result.close()
+    
+    filename = f"{name}-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no'
     })
 
+@app.route('/api/transactions/export', methods=['GET'])
+@login_required
+def export_transactions():
+    try:
+        statement = export_statement(Transaction, TRANSACTION_EXPORT_COLUMNS, current_user.id)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date'}), 400
+    return export_response(statement, 'transactions')
+
+@app.route('/api/trades/export', methods=['GET'])
+@login_required
+def export_trades():
+    try:
+        statement = export_statement(Trade, TRADE_EXPORT_COLUMNS, current_user.id)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date'}), 400
+    return export_response(statement, 'trades')
+
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+# Streaming and recursive endpoints cannot be answered inside a batch
+BATCH_EXCLUDED_ENDPOINTS = {
+    'batch', 'stream_events', 'export_transactions', 'export_trades', 'export_admin_transactions', 'export_admin_trades'
+}
+
+SUBREQUEST_ENVIRON_KEY = 'pipmatrix.batch_subrequest'
+
+def dispatch_subrequest(path, headers):
+    """
+    Run one GET sub-request inside the current app context and return its
+    Response. The sub-request reuses this request's session and g, so the
+    identity is loaded once per batch and every view shares one DB session.
+    Only the view runs; before/after request hooks (metrics, the expiry
+    scheduler) already ran for the batch itself, and teardown hooks, which
+    run when the sub-request's context is popped, see SUBREQUEST_ENVIRON_KEY
+    in the environ.
+    """
+    environ = EnvironBuilder(
+        path=path, method='GET', headers=headers, base_url=request.host_url,
+        environ_base={'REMOTE_ADDR': request.remote_addr, SUBREQUEST_ENVIRON_KEY: True}
+    ).get_environ()
+    with RequestContext(app, environ, session=session._get_current_object()):
+        if request.url_rule is not None and request.url_rule.endpoint in BATCH_EXCLUDED_ENDPOINTS:
+            return jsonify({'success': False, 'message': 'Endpoint not allowed in a batch'}), 400
+        try:
+            return app.make_response(app.dispatch_request())
+        except HTTPException as e:
+            return jsonify({'success': False, 'message': e.description}), e.code
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Batched request to %s failed', path)
+            return jsonify({'success': False, 'message': 'Internal error'}), 500
+
+@app.route('/api/batch', methods=['POST'])
+def batch():
+    """
+    Answer several read-only API calls in one round trip:
+    {"requests": [{"path": "/api/dashboard"}, {"path": "/api/trades?demo=true", "headers": {"If-None-Match": ...}}]}
+    Responses come back in order as {"status", "etag", "body"}; each keeps its
+    own status, so one failing call does not fail the batch.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Request body must be a JSON object'}), 400
+    calls = data.get('requests')
+    if not isinstance(calls, list) or not calls:
+        return jsonify({'success': False, 'message': 'requests must be a non-empty list'}), 400
+    if len(calls) > BATCH_MAX_REQUESTS:
+        return jsonify({'success': False, 'message': f'At most {BATCH_MAX_REQUESTS} requests per batch'}), 400
+    
+    parts = []
+    for call in calls:
+        path = call.get('path') if isinstance(call, dict) else None
+        if not isinstance(path, str) or not path.startswith('/api/'):
+            response = app.make_response((jsonify({'success': False, 'message': 'path must start with /api/'}), 400))
+        elif call.get('method', 'GET').upper() != 'GET':
+            response = app.make_response((jsonify({'success': False, 'message': 'Only GET requests can be batched'}), 405))
+        else:
+            headers = call.get('headers')
+            response = app.make_response(dispatch_subrequest(path, headers if isinstance(headers, dict) else {}))
+        
+        # Splice each JSON body in as-is rather than decoding and re-encoding it
+        body = response.get_data() if response.is_json and response.status_code != 304 else b'null'
+        head = app.json.dumps({'status': response.status_code, 'etag': response.headers.get('ETag')})
+        parts.append(head[:-1].encode() + b',"body":' + body.strip() + b'}')
+    
+    response = Response(b'{"success":true,"responses":[' + b','.join(parts) + b']}', mimetype='application/json')
+    response.cache_control.no_store = True
+    return response
+
+EXPIRY_POLL_SECONDS = float(os.environ.get('EXPIRY_POLL_SECONDS', 1))
+EXPIRY_GRACE_SECONDS = int(os.environ.get('EXPIRY_GRACE_SECONDS', 5))
+EXPIRY_BATCH_SIZE = 1000
+
+def settle_expired_demo_trades(now=None, batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Close open demo trades whose expiry has passed, oldest first, using the
+    cached market quote as exit price (entry price if there is none).
+    
+    Quotes are fetched before each batch is claimed, outside its transaction.
+    The batch is then one transaction of a few set-based statements: it is
+    claimed by flipping status to 'settling' where it is still 'open' (so a
+    concurrent browser close or another worker can never settle a trade
+    twice), the claimed rows are closed with one executemany, balances and
+    summaries are credited once per user and the per-trade credits are
+    ledgered with one more executemany. Returns the number settled.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=EXPIRY_GRACE_SECONDS)
+    trades_table = Trade.__table__
+    accounts = Account.__table__
+    settled = 0
+    
+    expired = (trades_table.c.status == 'open', trades_table.c.expires_at <= cutoff, trades_table.c.is_demo == True)
+    
+    while True:
+        # A quote refresh can be an upstream HTTP call, so it happens before
+        # the batch is claimed, never while its rows or the writer lock are held
+        symbols = db.session.execute(db.select(trades_table.c.symbol).where(*expired).distinct()).scalars().all()
+        if not symbols:
+            break
+        quotes = market_data.get_quotes(symbols)
+        
+        candidates = db.session.execute(
+            db.select(trades_table.c.id)
+            .where(*expired)
+            .order_by(trades_table.c.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not candidates:
+            break
+        
+        db.session.execute(
+            trades_table.update()
+            .where(trades_table.c.id.in_(candidates), trades_table.c.status == 'open')
+            .values(status='settling')
+        )
+        trades = db.session.execute(
+            db.select(trades_table)
+            .where(trades_table.c.id.in_(candidates), trades_table.c.status == 'settling')
+        ).all()
+        
+        closed_at = datetime.utcnow()
+        closes = []
+        entries = []
+        credits = defaultdict(float)
+        summary_deltas = defaultdict(lambda: defaultdict(float))
+        events = []
+        
+        for trade in trades:
+            quote = quotes.get(normalize_symbol(trade.symbol))
+            exit_price = quote['price'] if quote else trade.entry_price
+            profit_loss = demo_trade_profit_loss(trade, exit_price)
+            closes.append({'trade_id': trade.id, 'exit_price': exit_price, 'profit_loss': profit_loss})
+            
+            credit = demo_trade_return(trade.amount, profit_loss)
+            credits[trade.user_id] += credit
+            if credit:
+                entries.append({
+                    'user_id': trade.user_id, 'field': 'demo_balance', 'amount': credit,
+                    'kind': 'trade_close', 'reference': f'trade:{trade.id}', 'created_at': closed_at
+                })
+            deltas = summary_deltas[trade.user_id]
+            deltas['open_trades'] -= 1
+            deltas['open_amount'] -= trade.amount
+            for name, value in closed_trade_deltas(profit_loss).items():
+                deltas[name] += value
+            events.append((trade.user_id, {
+                'state': 'expired', 'id': trade.id, 'symbol': trade.symbol, 'is_demo': True,
+                'amount': trade.amount, 'entry_price': trade.entry_price, 'exit_price': exit_price,
+                'profit_loss': profit_loss, 'status': 'closed'
+            }))
+        
+        if closes:
+            db.session.execute(
+                trades_table.update()
+                .where(trades_table.c.id == db.bindparam('trade_id'), trades_table.c.status == 'settling')
+                .values(
+                    exit_price=db.bindparam('exit_price'),
+                    profit_loss=db.bindparam('profit_loss'),
+                    status='closed',
+                    closed_at=closed_at
+                ),
+                closes
+            )
+        if credits:
+            db.session.execute(
+                accounts.update()
+                .where(accounts.c.user_id == db.bindparam('uid'))
+                .values(demo_balance=accounts.c.demo_balance + db.bindparam('credit')),
+                [{'uid': user_id, 'credit': credit} for user_id, credit in credits.items()]
+            )
+        if entries:
+            db.session.execute(LedgerEntry.__table__.insert(), entries)
+        for user_id, deltas in summary_deltas.items():
+            apply_trade_summary(user_id, True, **deltas)
+        db.session.commit()
+        for user_id in credits:
+            identity_cache.invalidate(user_id)
+        
+        for user_id, data in events:
+            event_broker.publish('trade', data, user_id=user_id)
+        settled += len(events)
+        
+        if len(candidates) < batch_size:
+            break
+    
+    return settled
+
+class DemoExpiryScheduler:
+    """Background thread that settles expired demo trades every few seconds."""
+    def __init__(self, interval):
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def ensure_started(self):
+        if self._thread is not None or os.environ.get('DEMO_EXPIRY_SCHEDULER', '1') == '0':
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='demo-expiry', daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with app.app_context():
+                try:
+                    settle_expired_demo_trades()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Settling expired demo trades failed')
+                finally:
+                    db.session.remove()
+
+expiry_scheduler = DemoExpiryScheduler(EXPIRY_POLL_SECONDS)
+
+@app.before_request
+def start_background_workers():
+    expiry_scheduler.ensure_started()
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Added by reverse proxies: a proxied request's loopback peer is the proxy, not the client
+FORWARDED_HEADERS = ('Forwarded', 'X-Forwarded-For', 'X-Real-IP')
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+SLOW_LOG_MAX_STATEMENTS = 50
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+class RequestMetrics:
+    """
+    Per-endpoint request latency and SQL usage, rendered in the Prometheus
+    text format. Counters live in this process only: under gunicorn each
+    worker reports its own requests.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+    
+    def observe(self, endpoint, method, status, seconds, statements, sql_seconds, slow):
+        with self._lock:
+            series = self._series.get((endpoint, method))
+            if series is None:
+                series = self._series[(endpoint, method)] = {
+                    'latency': [0] * (len(LATENCY_BUCKETS) + 1),
+                    'latency_sum': 0.0,
+                    'statements': [0] * (len(STATEMENT_BUCKETS) + 1),
+                    'statements_sum': 0,
+                    'sql_seconds': 0.0,
+                    'statuses': defaultdict(int),
+                    'slow': 0
+                }
+            series['latency'][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            series['latency_sum'] += seconds
+            series['statements'][bisect_left(STATEMENT_BUCKETS, statements)] += 1
+            series['statements_sum'] += statements
+            series['sql_seconds'] += sql_seconds
+            series['statuses'][status] += 1
+            series['slow'] += slow
+    
+    def render(self):
+        with self._lock:
+            series = {key: dict(value, latency=list(value['latency']), statements=list(value['statements']),
+                                statuses=dict(value['statuses'])) for key, value in self._series.items()}
+        
+        lines = []
+        def histogram(name, help_text, buckets, counts_key, sum_key):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (endpoint, method), values in sorted(series.items()):
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), values[counts_key]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {values[sum_key]}')
+                lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        def counter(name, help_text, rows):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            lines.extend(f'{name}{{{labels}}} {value}' for labels, value in rows)
+        
+        histogram('http_request_duration_seconds', 'Request latency by endpoint.',
+                  LATENCY_BUCKETS, 'latency', 'latency_sum')
+        histogram('db_statements_per_request', 'SQL statements executed per request.',
+                  STATEMENT_BUCKETS, 'statements', 'statements_sum')
+        counter('http_requests_total', 'Requests by endpoint and status code.', [
+            (f'endpoint="{endpoint}",method="{method}",status="{status}"', count)
+            for (endpoint, method), values in sorted(series.items())
+            for status, count in sorted(values['statuses'].items())
+        ])
+        counter('db_statement_seconds_total', 'Time spent executing SQL, by endpoint.', [
+            (f'endpoint="{endpoint}",method="{method}"', values['sql_seconds'])
+            for (endpoint, method), values in sorted(series.items())
+        ])
+        counter('http_slow_requests_total', f'Requests slower than SLOW_REQUEST_MS ({SLOW_REQUEST_MS:g} ms).', [
+            (f'endpoint="{endpoint}",method="{method}"', values['slow'])
+            for (endpoint, method), values in sorted(series.items())
+        ])
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+def before_sql_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['sql_started'] = time.perf_counter()
+
+def after_sql_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('sql_started', None)
+    if started is None or not has_request_context() or 'metrics_started' not in g:
+        return
+    elapsed = time.perf_counter() - started
+    g.sql_statements += 1
+    g.sql_seconds += elapsed
+    if len(g.sql_log) < SLOW_LOG_MAX_STATEMENTS:
+        g.sql_log.append((statement, elapsed))
+
+if METRICS_ENABLED:
+    with app.app_context():
+        db.event.listen(db.engine, 'before_cursor_execute', before_sql_execute)
+        db.event.listen(db.engine, 'after_cursor_execute', after_sql_execute)
+
+@app.before_request
+def start_request_metrics():
+    if METRICS_ENABLED:
+        g.metrics_started = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+        g.sql_log = []
+
+@app.after_request
+def record_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # Batched sub-requests share the batch's g; their time and SQL count
+    # towards the batch, which is recorded once under its own endpoint
+    if request.environ.get(SUBREQUEST_ENVIRON_KEY):
+        return
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    status = 500 if exc is not None else g.get('metrics_status', 500)
+    slow = SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS
+    request_metrics.observe(request.endpoint or 'unmatched', request.method, status, elapsed,
+                            g.sql_statements, g.sql_seconds, slow)
+    
+    if slow:
+        statements = ''.join(
+            f'\n  {seconds * 1000:8.1f} ms  {" ".join(statement.split())[:300]}'
+            for statement, seconds in g.sql_log
+        )
+        app.logger.warning(
+            'Slow request: %s %s -> %s in %.0f ms, %d SQL statements (%.0f ms)%s',
+            request.method, request.path, status, elapsed * 1000, g.sql_statements, g.sql_seconds * 1000, statements
+        )
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus scrape endpoint. Unless METRICS_TOKEN is set (then that bearer
+    token is required), only direct loopback requests are answered: anything
+    that came through a reverse proxy is refused, as the proxy's own address
+    may be loopback.
+    """
+    if METRICS_TOKEN:
+        if not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'):
+            return jsonify({'success': False, 'message': 'Forbidden'}), 403
+    elif request.remote_addr not in ('127.0.0.1', '::1') or any(h in request.headers for h in FORWARDED_HEADERS):
+        return jsonify({'success': False, 'message': 'Forbidden'}), 403
+    
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -1272,30 +2788,95 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def paginate_admin_listing(model, query, search_columns=()):
+    """
+    Shared status/search filtering and pagination for the admin listings.
+    The owning user is fetched in the same query (outer join + contains_eager)
+    instead of one User lookup per row.
+    """
+    page = request.args.get('page', 1, type=int)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+    status = request.args.get('status', 'pending')
+    search = request.args.get('search', '').strip()
+    user_id = request.args.get('user_id', type=int)
+    
+    query = query.outerjoin(User, User.id == model.user_id).options(db.contains_eager(model.user))
+    if status != 'all':
+        query = query.filter(model.status == status)
+    if user_id:
+        query = query.filter(model.user_id == user_id)
+    if search:
+        pattern = f'%{search}%'
+        columns = [User.username, User.email, User.full_name, *search_columns]
+        query = query.filter(db.or_(*[c.ilike(pattern) for c in columns]))
+    
+    # Past the last page yields an empty page with the real page count, not a 404
+    return query.order_by(model.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+
+ADMIN_STATS_TTL = float(os.environ.get('ADMIN_STATS_TTL', 10))
+
+class CachedValue:
+    """
+    A value computed on demand and reused by this process for ttl seconds.
+    Concurrent callers that find it stale wait for one recomputation instead
+    of each running it. invalidate() makes the next get() recompute; other
+    worker processes pick up the change when their copy expires.
+    """
+    def __init__(self, compute, ttl):
+        self.compute = compute
+        self.ttl = ttl
+        self._value = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+    
+    def get(self):
+        if time.monotonic() < self._expires:
+            return self._value
+        with self._lock:
+            if time.monotonic() >= self._expires:
+                self._value = self.compute()
+                self._expires = time.monotonic() + self.ttl
+            return self._value
+    
+    def invalidate(self):
+        self._expires = 0.0
+
+def compute_admin_stats():
+    """All dashboard counters in one statement: a single pass over users plus index-backed counts."""
+    count = db.func.count
+    users = db.select(
+        count().label('total'),
+        db.func.coalesce(db.func.sum(db.case(
+            (User.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0), 1), else_=0
+        )), 0).label('today')
+    ).where(User.is_admin == False).subquery()
+    
+    def pending(kind):
+        return db.select(count()).where(Transaction.type == kind, Transaction.status == 'pending').scalar_subquery()
+    
+    row = db.session.execute(db.select(
+        users.c.total,
+        users.c.today,
+        pending('deposit'),
+        pending('withdrawal'),
+        db.select(count()).where(Subscription.status == 'pending').scalar_subquery(),
+        db.select(count()).where(TradeRule.is_active == True).scalar_subquery()
+    ).select_from(users)).one()
+    
+    return dict(zip(
+        ('total_users', 'new_users_today', 'pending_deposits', 'pending_withdrawals', 'pending_subscriptions', 'active_trade_rules'),
+        row
+    ))
+
+admin_stats = CachedValue(compute_admin_stats, ADMIN_STATS_TTL)
+
 @app.route('/api/admin/stats', methods=['GET'])
 @login_required
 @admin_required
 def get_admin_stats():
-    total_users = User.query.filter_by(is_admin=False).count()
-    new_users_today = User.query.filter(
-        User.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0),
-        User.is_admin == False
-    ).count()
-    pending_deposits = Transaction.query.filter_by(type='deposit', status='pending').count()
-    pending_withdrawals = Transaction.query.filter_by(type='withdrawal', status='pending').count()
-    pending_subscriptions = Subscription.query.filter_by(status='pending').count()
-    active_trade_rules = TradeRule.query.filter_by(is_active=True).count()
-    
     return jsonify({
         'success': True,
-        'stats': {
-            'total_users': total_users,
-            'new_users_today': new_users_today,
-            'pending_deposits': pending_deposits,
-            'pending_withdrawals': pending_withdrawals,
-            'pending_subscriptions': pending_subscriptions,
-            'active_trade_rules': active_trade_rules
-        }
+        'stats': admin_stats.get()
     })
 
 @app.route('/api/admin/users', methods=['GET'])
@@ -1303,7 +2884,7 @@ def get_admin_stats():
 @admin_required
 def get_admin_users():
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
     
     users = User.query.filter_by(is_admin=False).order_by(User.created_at.desc()).paginate(page=page, per_page=per_page)
     
@@ -1328,6 +2909,32 @@ def get_admin_users():
         'current_page': page
     })
 
+@app.route('/api/admin/users/<int:user_id>/balances', methods=['GET'])
+@login_required
+@admin_required
+def get_admin_user_balances(user_id):
+    """Ledger-derived balances for a user as of ?at= (ISO datetime, default now)."""
+    try:
+        at = datetime.fromisoformat(request.args['at']) if request.args.get('at') else datetime.utcnow()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid at date'}), 400
+    
+    if not Account.query.filter_by(user_id=user_id).first():
+        return jsonify({'success': False, 'message': 'User account not found'}), 404
+    
+    values, snapshot = balance_at(user_id, at)
+    return jsonify({
+        'success': True,
+        'user_id': user_id,
+        'at': at.isoformat(),
+        'balances': values,
+        'snapshot': {
+            'id': snapshot.id,
+            'ledger_id': snapshot.ledger_id,
+            'created_at': snapshot.created_at.isoformat()
+        } if snapshot else None
+    })
+
 @app.route('/api/admin/new-signups', methods=['GET'])
 @login_required
 @admin_required
@@ -1356,17 +2963,15 @@ def get_new_signups():
 @login_required
 @admin_required
 def get_admin_deposits():
-    status = request.args.get('status', 'pending')
-    
-    query = Transaction.query.filter_by(type='deposit')
-    if status != 'all':
-        query = query.filter_by(status=status)
-    
-    deposits = query.order_by(Transaction.created_at.desc()).all()
+    deposits = paginate_admin_listing(
+        Transaction,
+        Transaction.query.filter(Transaction.type == 'deposit'),
+        search_columns=(Transaction.reference, Transaction.txid)
+    )
     
     result = []
-    for d in deposits:
-        user = User.query.get(d.user_id)
+    for d in deposits.items:
+        user = d.user
         result.append({
             'id': d.id,
             'user_id': d.user_id,
@@ -1384,7 +2989,13 @@ def get_admin_deposits():
             'created_at': d.created_at.isoformat() if d.created_at else None
         })
     
-    return jsonify({'success': True, 'deposits': result})
+    return jsonify({
+        'success': True,
+        'deposits': result,
+        'total': deposits.total,
+        'pages': deposits.pages,
+        'current_page': deposits.page
+    })
 
 @app.route('/api/admin/deposits/<int:deposit_id>/accept', methods=['POST'])
 @login_required
@@ -1401,10 +3012,9 @@ def accept_deposit(deposit_id):
     if not user or not user.account:
         return jsonify({'success': False, 'message': 'User account not found'}), 404
     
-    user.account.balance += deposit.amount
-    user.account.total_deposits += deposit.amount
-    deposit.status = 'completed'
-    deposit.completed_at = datetime.utcnow()
+    if not claim_transaction(deposit, 'completed'):
+        return jsonify({'success': False, 'message': 'Deposit already processed'}), 400
+    credit_account(user.id, deposit.amount, 'deposit', deposit.reference, total_deposits=deposit.amount)
     
     notification = Notification(
         user_id=user.id,
@@ -1414,6 +3024,7 @@ def accept_deposit(deposit_id):
     )
     db.session.add(notification)
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({
         'success': True,
@@ -1434,7 +3045,8 @@ def reject_deposit(deposit_id):
     if deposit.status != 'pending':
         return jsonify({'success': False, 'message': 'Deposit already processed'}), 400
     
-    deposit.status = 'rejected'
+    if not claim_transaction(deposit, 'rejected'):
+        return jsonify({'success': False, 'message': 'Deposit already processed'}), 400
     deposit.admin_notes = reason
     
     notification = Notification(
@@ -1445,6 +3057,7 @@ def reject_deposit(deposit_id):
     )
     db.session.add(notification)
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({'success': True, 'message': 'Deposit rejected'})
 
@@ -1452,17 +3065,15 @@ def reject_deposit(deposit_id):
 @login_required
 @admin_required
 def get_admin_withdrawals():
-    status = request.args.get('status', 'pending')
-    
-    query = Transaction.query.filter_by(type='withdrawal')
-    if status != 'all':
-        query = query.filter_by(status=status)
-    
-    withdrawals = query.order_by(Transaction.created_at.desc()).all()
+    withdrawals = paginate_admin_listing(
+        Transaction,
+        Transaction.query.filter(Transaction.type == 'withdrawal'),
+        search_columns=(Transaction.reference, Transaction.wallet_address)
+    )
     
     result = []
-    for w in withdrawals:
-        user = User.query.get(w.user_id)
+    for w in withdrawals.items:
+        user = w.user
         result.append({
             'id': w.id,
             'user_id': w.user_id,
@@ -1477,7 +3088,13 @@ def get_admin_withdrawals():
             'created_at': w.created_at.isoformat() if w.created_at else None
         })
     
-    return jsonify({'success': True, 'withdrawals': result})
+    return jsonify({
+        'success': True,
+        'withdrawals': result,
+        'total': withdrawals.total,
+        'pages': withdrawals.pages,
+        'current_page': withdrawals.page
+    })
 
 @app.route('/api/admin/withdrawals/<int:withdrawal_id>/approve', methods=['POST'])
 @login_required
@@ -1494,14 +3111,12 @@ def approve_withdrawal(withdrawal_id):
     if not user or not user.account:
         return jsonify({'success': False, 'message': 'User account not found'}), 404
     
-    if user.account.balance < withdrawal.amount:
+    if not claim_transaction(withdrawal, 'completed'):
+        return jsonify({'success': False, 'message': 'Withdrawal already processed'}), 400
+    if not debit_account(user.id, withdrawal.amount, 'withdrawal', withdrawal.reference, total_withdrawals=withdrawal.amount):
+        db.session.rollback()
         return jsonify({'success': False, 'message': 'User has insufficient balance'}), 400
     
-    user.account.balance -= withdrawal.amount
-    user.account.total_withdrawals += withdrawal.amount
-    withdrawal.status = 'completed'
-    withdrawal.completed_at = datetime.utcnow()
-    
     notification = Notification(
         user_id=user.id,
         title='Withdrawal Approved',
@@ -1510,6 +3125,7 @@ def approve_withdrawal(withdrawal_id):
     )
     db.session.add(notification)
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({'success': True, 'message': 'Withdrawal approved and processed'})
 
@@ -1527,7 +3143,8 @@ def reject_withdrawal(withdrawal_id):
     if withdrawal.status != 'pending':
         return jsonify({'success': False, 'message': 'Withdrawal already processed'}), 400
     
-    withdrawal.status = 'rejected'
+    if not claim_transaction(withdrawal, 'rejected'):
+        return jsonify({'success': False, 'message': 'Withdrawal already processed'}), 400
     withdrawal.admin_notes = reason
     
     notification = Notification(
@@ -1538,24 +3155,54 @@ def reject_withdrawal(withdrawal_id):
     )
     db.session.add(notification)
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({'success': True, 'message': 'Withdrawal rejected'})
 
+@app.route('/api/admin/transactions/export', methods=['GET'])
+@login_required
+@admin_required
+def export_admin_transactions():
+    """All users' transactions (or ?user_id=), with the owner's username and email."""
+    try:
+        statement = export_statement(
+            Transaction,
+            (*TRANSACTION_EXPORT_COLUMNS, Transaction.user_id, User.username, User.email,
+             Transaction.wallet_address, Transaction.admin_notes),
+            request.args.get('user_id', type=int)
+        ).outerjoin(User, User.id == Transaction.user_id)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date'}), 400
+    return export_response(statement, 'transactions')
+
+@app.route('/api/admin/trades/export', methods=['GET'])
+@login_required
+@admin_required
+def export_admin_trades():
+    """All users' trades (or ?user_id=), with the owner's username and email."""
+    try:
+        statement = export_statement(
+            Trade,
+            (*TRADE_EXPORT_COLUMNS, Trade.user_id, User.username, User.email),
+            request.args.get('user_id', type=int)
+        ).outerjoin(User, User.id == Trade.user_id)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date'}), 400
+    return export_response(statement, 'trades')
+
 @app.route('/api/admin/subscriptions', methods=['GET'])
 @login_required
 @admin_required
 def get_admin_subscriptions():
-    status = request.args.get('status', 'pending')
-    
-    query = Subscription.query
-    if status != 'all':
-        query = query.filter_by(status=status)
-    
-    subscriptions = query.order_by(Subscription.created_at.desc()).all()
+    subscriptions = paginate_admin_listing(
+        Subscription,
+        Subscription.query,
+        search_columns=(Subscription.subscription_type, Subscription.txid)
+    )
     
     result = []
-    for s in subscriptions:
-        user = User.query.get(s.user_id)
+    for s in subscriptions.items:
+        user = s.user
         result.append({
             'id': s.id,
             'user_id': s.user_id,
@@ -1570,7 +3217,13 @@ def get_admin_subscriptions():
             'created_at': s.created_at.isoformat() if s.created_at else None
         })
     
-    return jsonify({'success': True, 'subscriptions': result})
+    return jsonify({
+        'success': True,
+        'subscriptions': result,
+        'total': subscriptions.total,
+        'pages': subscriptions.pages,
+        'current_page': subscriptions.page
+    })
 
 @app.route('/api/admin/subscriptions/<int:sub_id>/approve', methods=['POST'])
 @login_required
@@ -1597,6 +3250,7 @@ def approve_subscription(sub_id):
     )
     db.session.add(notification)
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({'success': True, 'message': 'Subscription approved'})
 
@@ -1660,6 +3314,7 @@ def create_trade_rule():
     )
     db.session.add(rule)
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({
         'success': True,
@@ -1697,6 +3352,7 @@ def update_trade_rule(rule_id):
             pass
     
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({'success': True, 'message': 'Trade rule updated'})
 
@@ -1710,6 +3366,7 @@ def delete_trade_rule(rule_id):
     
     db.session.delete(rule)
     db.session.commit()
+    admin_stats.invalidate()
     
     return jsonify({'success': True, 'message': 'Trade rule deleted'})
 
@@ -1743,8 +3400,113 @@ def create_initial_admin():
     
     return jsonify({'success': True, 'message': 'Admin account created'})
 
+@app.cli.command('rebuild-trade-summaries')
+@click.option('--check', is_flag=True, help='Only report summaries that drifted from the Trade table.')
+def rebuild_trade_summaries_command(check):
+    """Recompute TradingSummary rows from the Trade table."""
+    if not check:
+        summaries = rebuild_trading_summaries()
+        db.session.commit()
+        click.echo(f'Rebuilt {len(summaries)} trading summaries.')
+        return
+    
+    expected = summarize_trades()
+    drifted = 0
+    for stored in TradingSummary.query.yield_per(1000):
+        values = expected.pop((stored.user_id, stored.is_demo), dict.fromkeys(SUMMARY_COLUMNS, 0))
+        diffs = {name: (getattr(stored, name), value) for name, value in values.items()
+                 if abs(getattr(stored, name) - value) > 1e-6}
+        if diffs:
+            drifted += 1
+            click.echo(f'user {stored.user_id} {"demo" if stored.is_demo else "live"}: {diffs}')
+    for (user_id, is_demo) in expected:
+        drifted += 1
+        click.echo(f'user {user_id} {"demo" if is_demo else "live"}: summary row missing')
+    
+    click.echo(f'{drifted} drifted summaries.')
+    if drifted:
+        raise SystemExit(1)
+
+@app.cli.command('snapshot-balances')
+@click.option('--min-entries', default=1, show_default=True, help='Only snapshot accounts with at least this many new ledger entries.')
+def snapshot_balances_command(min_entries):
+    """Snapshot account balances so audits only replay newer ledger entries (run periodically from cron)."""
+    taken = snapshot_balances(min_entries)
+    db.session.commit()
+    click.echo(f'Took {taken} balance snapshots.')
+
+@app.cli.command('verify-ledger')
+def verify_ledger_command():
+    """Check every Account against its latest snapshot plus the ledger entries since."""
+    mismatches = 0
+    for user_id, field, expected, actual in verify_ledger():
+        mismatches += 1
+        click.echo(f'user {user_id} {field}: ledger {expected:.2f}, account {"missing" if actual is None else f"{actual:.2f}"}')
+    
+    click.echo(f'{mismatches} ledger mismatches.')
+    if mismatches:
+        raise SystemExit(1)
+
+TAILWIND_CLI = os.environ.get('TAILWIND_CLI', 'npx --yes tailwindcss@3')
+
+@app.cli.command('build-assets')
+@click.option('--vendor', is_flag=True, help='Download the CDN scripts and serve them from the build instead.')
+@click.option('--tailwind', is_flag=True, help='Compile the Tailwind CDN pages to static stylesheets with TAILWIND_CLI.')
+def build_assets_command(vendor, tailwind):
+    """Fingerprint and precompress the pages and static files into ASSET_BUILD_DIR (restart workers to serve it)."""
+    try:
+        report = assets.build(basedir, ASSET_BUILD_DIR, vendor=vendor, tailwind=TAILWIND_CLI if tailwind else None)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for path, sizes in report.items():
+        if 'pages' in sizes:
+            click.echo(f'{path}: {sizes["pages"]} pages, {sizes["raw"]:,} bytes ({sizes.get("gzip", sizes["raw"]):,} gzip) in {sizes["seconds"]:.1f}s')
+    encodings = ('raw', 'gzip', 'br') if assets.brotli else ('raw', 'gzip')
+    totals = {encoding: sum(sizes.get(encoding, sizes['raw']) for sizes in report.values()) for encoding in encodings}
+    click.echo(f'Built {len(report)} files into {ASSET_BUILD_DIR}: ' + ', '.join(
+        f'{size:,} bytes {encoding}' for encoding, size in totals.items()
+    ) + ('' if assets.brotli else ' (install brotli for .br files)'))
+
+@app.cli.command('settle-expired-trades')
+def settle_expired_trades_command():
+    """Settle expired demo trades once (for cron instead of the in-process scheduler)."""
+    click.echo(f'Settled {settle_expired_demo_trades()} expired demo trades.')
+
+def ensure_columns():
+    """
+    create_all() never alters existing tables. Add nullable columns that were
+    declared on models after the table was first created.
+    """
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as conn:
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+
+def ensure_indexes():
+    """
+    create_all() only creates missing tables, so indexes declared on models
+    are never added to an existing app.db. Create any that are missing.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
 with app.app_context():
     db.create_all()
+    ensure_columns()
+    ensure_indexes()
+    snapshot_unledgered_accounts()
+    db.session.commit()
+    backfill_trading_summaries()
+
+for _wallet in CRYPTO_WALLETS.values():
+    generate_qr_code(_wallet['address'])
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
@@ -0,0 +1,306 @@
+"""
+Build step for the static pages and scripts.
+
+build() copies the HTML pages, static/ and images/ into a build directory:
+scripts and images get content-hashed filenames (static/js/api.3f9c1d2e7a4b.js)
+that the pages are rewritten to reference, and every text file is
+precompressed next to itself as .gz and, when the optional brotli package is
+installed, .br. With vendor=True the CDN scripts in VENDOR_SCRIPTS are
+downloaded once (as their minified builds), fingerprinted into vendor/ and
+the pages point at those instead; repeated tags for the same script are
+dropped. With tailwind set to a Tailwind v3 CLI command, the pages' in-browser
+Tailwind (the cdn.tailwindcss.com script plus its inline tailwind.config) is
+compiled ahead of time into purged, minified, hashed stylesheets under
+static/css/, one per distinct inline config, linked in its place.
+
+The result is described by manifest.json, mapping each URL path to its file,
+strong ETag and available encodings. load_manifest() reads it for serving;
+the source tree stays untouched, so without a build the app serves the
+original files.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from urllib.request import urlopen
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST = 'manifest.json'
+FINGERPRINT_DIRS = ('static', 'images')
+COMPRESSIBLE = ('.html', '.js', '.css', '.svg', '.json', '.txt')
+
+# CDN script URL used by the pages -> (vendored name, minified build to download)
+VENDOR_SCRIPTS = {
+    'https://unpkg.com/lucide@latest/dist/umd/lucide.js': ('lucide', 'https://unpkg.com/lucide@latest/dist/umd/lucide.min.js'),
+    'https://unpkg.com/lucide@latest': ('lucide', 'https://unpkg.com/lucide@latest/dist/umd/lucide.min.js'),
+    'https://cdn.jsdelivr.net/npm/sweetalert2@11': ('sweetalert2', 'https://cdn.jsdelivr.net/npm/sweetalert2@11/dist/sweetalert2.all.min.js'),
+    'https://cdn.jsdelivr.net/npm/alpinejs@3.x.x/dist/cdn.min.js': ('alpinejs', 'https://cdn.jsdelivr.net/npm/alpinejs@3.x.x/dist/cdn.min.js'),
+    'https://unpkg.com/alpinejs@3.x.x/dist/cdn.min.js': ('alpinejs', 'https://cdn.jsdelivr.net/npm/alpinejs@3.x.x/dist/cdn.min.js'),
+    'https://code.jquery.com/jquery-3.6.0.min.js': ('jquery', 'https://code.jquery.com/jquery-3.6.0.min.js'),
+}
+
+TAILWIND_CDN = re.compile(r'''[ \t]*<script\s+src=(["'])https://cdn\.tailwindcss\.com/?\1\s*>\s*</script>[ \t]*\n?''')
+TAILWIND_CONFIG = re.compile(r'''[ \t]*tailwind\.config\s*=\s*(?=\{)''')
+INLINE_SCRIPT = re.compile(r'''[ \t]*<script>(.*?)</script>[ \t]*\n?''', re.S)
+TAILWIND_INPUT = '@tailwind base;\n@tailwind components;\n@tailwind utilities;\n'
+# Markup that may build class names at runtime, scanned along with the pages
+TAILWIND_CONTENT = ('static/js/*.js',)
+
+REFERENCE = re.compile(r'''(\s(?:src|href)=)(["'])(/?)([^"'?#]+)\2''')
+SCRIPT_TAG = re.compile(r'''[ \t]*<script\b[^>]*\ssrc=(["'])([^"']+)\1[^>]*>\s*</script>[ \t]*\n?''')
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def fingerprint(path, digest):
+    base, ext = os.path.splitext(path)
+    return f'{base}.{digest[:12]}{ext}'
+
+def write(out, path, data):
+    target = os.path.join(out, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+
+def compress(out, path, data):
+    """Write the .gz/.br siblings that beat the original; returns {encoding: size}."""
+    encoded = {}
+    if not path.endswith(COMPRESSIBLE):
+        return encoded
+    candidates = {'gzip': ('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli:
+        candidates['br'] = ('.br', lambda: brotli.compress(data, quality=11))
+    for encoding, (suffix, compressor) in candidates.items():
+        compressed = compressor()
+        if len(compressed) < len(data):
+            write(out, path + suffix, compressed)
+            encoded[encoding] = len(compressed)
+    return encoded
+
+def vendor_scripts(urls, fetch=None):
+    """Download each distinct script in VENDOR_SCRIPTS once; returns {cdn url: (vendored path, bytes)}."""
+    fetch = fetch or (lambda url: urlopen(url, timeout=30).read())
+    downloads = {}
+    vendored = {}
+    for url in sorted(urls):
+        name, source = VENDOR_SCRIPTS[url]
+        if source not in downloads:
+            data = fetch(source)
+            downloads[source] = (fingerprint(f'vendor/{name}.min.js', content_hash(data)), data)
+        vendored[url] = downloads[source]
+    return vendored
+
+def rewrite_page(html, renamed, vendored):
+    def reference(match):
+        prefix, quote, slash, path = match.groups()
+        if path in renamed:
+            return f'{prefix}{quote}{slash}{renamed[path]}{quote}'
+        return match.group(0)
+
+    seen = set()
+    def script(match):
+        url = match.group(2)
+        if url not in vendored:
+            return match.group(0)
+        path = vendored[url][0]
+        if path in seen:
+            return ''
+        seen.add(path)
+        return match.group(0).replace(url, path)
+
+    if vendored:
+        html = SCRIPT_TAG.sub(script, html)
+    return REFERENCE.sub(reference, html)
+
+def object_literal_end(text, start):
+    """Index just past the JS object literal opening at text[start], skipping braces inside strings."""
+    depth = 0
+    quote = None
+    i = start
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '\'"`':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ValueError('unterminated tailwind.config object')
+
+def split_tailwind(html):
+    """
+    Return (inline config or None, page without the Tailwind script tag and
+    config assignment), or None if the page does not load the Play CDN. The
+    assignment is cut out of whichever inline script holds it; the script is
+    dropped only if nothing else is left in it. Raises ValueError when the
+    page still refers to the tailwind global afterwards, since the compiled
+    page would fail at runtime or be styled without its config.
+    """
+    if not TAILWIND_CDN.search(html):
+        return None
+    config = None
+    for script in INLINE_SCRIPT.finditer(html):
+        body = script.group(1)
+        match = TAILWIND_CONFIG.search(body)
+        if not match:
+            continue
+        end = object_literal_end(body, match.end())
+        config = body[match.end():end]
+        rest = re.sub(r'^[ \t]*;?[ \t]*\n?', '', body[end:])
+        body = body[:match.start()] + rest
+        if body.strip():
+            html = html[:script.start(1)] + body + html[script.end(1):]
+        else:
+            html = html[:script.start()] + html[script.end():]
+        break
+    if re.search(r'\btailwind\.', html):
+        raise ValueError('unrecognised use of the tailwind global')
+    return config, html
+
+def compile_tailwind(command, root, pages, config):
+    """
+    Run the Tailwind CLI over pages with the given inline config (a JS object
+    literal) and return the minified CSS. Raises RuntimeError if it fails.
+    """
+    with tempfile.TemporaryDirectory(prefix='tailwind-') as work:
+        content = [os.path.join(root, page) for page in pages] + [os.path.join(root, glob) for glob in TAILWIND_CONTENT]
+        with open(os.path.join(work, 'tailwind.config.js'), 'w') as f:
+            f.write(f'const config = {config or "{}"};\nconfig.content = {json.dumps(content)};\nmodule.exports = config;\n')
+        with open(os.path.join(work, 'input.css'), 'w') as f:
+            f.write(TAILWIND_INPUT)
+        try:
+            subprocess.run(
+                shlex.split(command) + ['-c', 'tailwind.config.js', '-i', 'input.css', '-o', 'output.css', '--minify'],
+                cwd=work, capture_output=True, text=True, check=True
+            )
+        except OSError as e:
+            raise RuntimeError(f'Cannot run {command!r}: {e}')
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f'{command!r} failed: {e.stderr.strip()}')
+        with open(os.path.join(work, 'output.css'), 'rb') as f:
+            return f.read()
+
+def build_tailwind(command, root, sources):
+    """
+    Compile one stylesheet per distinct inline config. Returns
+    ({page: rewritten html}, {stylesheet path: css}, {stylesheet path: stats}).
+    """
+    groups = {}
+    stripped = {}
+    for name, html in sorted(sources.items()):
+        try:
+            split = split_tailwind(html)
+        except ValueError as e:
+            raise RuntimeError(f'{name}: {e}; cannot replace the Tailwind CDN')
+        if split is not None:
+            config, stripped[name] = split
+            # Pages whose configs differ only in whitespace share a stylesheet
+            key = config and re.sub(r'\s+', ' ', config)
+            groups.setdefault(key, (config, []))[1].append(name)
+
+    pages, stylesheets, stats = {}, {}, {}
+    for config, names in groups.values():
+        started = time.perf_counter()
+        css = compile_tailwind(command, root, names, config)
+        path = fingerprint('static/css/tailwind.css', content_hash(css))
+        stylesheets[path] = css
+        stats[path] = {'pages': len(names), 'seconds': round(time.perf_counter() - started, 3)}
+        # The link takes the CDN script's place, so the pages' own <style> blocks still override it
+        link = lambda match: re.match(r'[ \t]*', match.group(0)).group(0) + f'<link rel="stylesheet" href="{path}">\n'
+        for name in names:
+            pages[name] = TAILWIND_CDN.sub(link, stripped[name], count=1)
+    return pages, stylesheets, stats
+
+def build(root, out, vendor=False, fetch=None, tailwind=None):
+    """
+    Build the fingerprinted, precompressed copy of the site in out (replacing
+    it). Returns a report: {url path: {'raw': bytes, encoding: bytes, ...}};
+    compiled stylesheets also carry the number of pages using them and the
+    compile time in seconds. The previous build is only replaced once the
+    new one is complete.
+    """
+    final, out = out, out.rstrip(os.sep) + '.new'
+    if os.path.isdir(out):
+        shutil.rmtree(out)
+    os.makedirs(out)
+
+    files = {}
+    renamed = {}
+    for directory in FINGERPRINT_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(root, directory)):
+            for filename in sorted(filenames):
+                source = os.path.join(dirpath, filename)
+                path = os.path.relpath(source, root).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    data = f.read()
+                renamed[path] = fingerprint(path, content_hash(data))
+                files[renamed[path]] = (data, True)
+
+    pages = {}
+    for name in sorted(os.listdir(root)):
+        if name.endswith('.html'):
+            with open(os.path.join(root, name), encoding='utf-8') as f:
+                pages[name] = f.read()
+
+    stats = {}
+    if tailwind:
+        compiled, stylesheets, stats = build_tailwind(tailwind, root, pages)
+        pages.update(compiled)
+        for path, css in stylesheets.items():
+            files[path] = (css, True)
+
+    vendored = {}
+    if vendor:
+        used = {url for html in pages.values() for _, url in SCRIPT_TAG.findall(html) if url in VENDOR_SCRIPTS}
+        vendored = vendor_scripts(used, fetch)
+        for path, data in vendored.values():
+            files[path] = (data, True)
+
+    for name, html in pages.items():
+        files[name] = (rewrite_page(html, renamed, vendored).encode('utf-8'), False)
+
+    manifest = {}
+    report = {}
+    for path, (data, immutable) in sorted(files.items()):
+        write(out, path, data)
+        encoded = compress(out, path, data)
+        manifest[path] = {
+            'file': path,
+            'etag': content_hash(data)[:32],
+            'encodings': sorted(encoded, key=('br', 'gzip').index),
+            'immutable': immutable,
+        }
+        report[path] = {'raw': len(data), **encoded, **stats.get(path, {})}
+
+    with open(os.path.join(out, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    if os.path.isdir(final):
+        shutil.rmtree(final)
+    os.rename(out, final)
+    return report
+
+def load_manifest(out):
+    """The build's {url path: entry} map, or {} when nothing has been built."""
+    try:
+        with open(os.path.join(out, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
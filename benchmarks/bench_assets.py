@@ -0,0 +1,113 @@
+"""
+Page weight and serve time before and after `flask --app app build-assets`.
+
+For every HTML page, compares what a cold load fetches from this server and
+from CDNs when the source tree is served as-is with what it fetches from
+the build: page bytes on the wire, bytes of same-origin scripts and
+stylesheets it references, and the number of third-party scripts (the
+Tailwind Play CDN among them, which compiles CSS in the browser on every
+view). Also times serving each page through the Flask test client both ways,
+plus a conditional revalidation against the build. Browser-side Tailwind JIT
+time is not measured here; it disappears with the CDN script.
+
+    flask --app app build-assets --tailwind
+    python benchmarks/bench_assets.py --repeat 20
+
+--cdn-sizes downloads each third-party script once to add its gzip size to
+the before column (needs network access).
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+import time
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DEMO_EXPIRY_SCHEDULER', '0')
+
+import app as app_module
+
+REFERENCE = re.compile(r'''<(?:script|link)\b[^>]*\s(?:src|href)=["']([^"']+)["']''')
+
+def cdn_size(url, cache):
+    if url not in cache:
+        try:
+            request = Request(url, headers={'Accept-Encoding': 'gzip'})
+            with urlopen(request, timeout=30) as response:
+                data = response.read()
+            cache[url] = len(data) if response.headers.get('Content-Encoding') == 'gzip' else len(gzip.compress(data))
+        except OSError:
+            cache[url] = 0
+    return cache[url]
+
+def page_weight(client, page, cdn_sizes):
+    """(bytes fetched from this server, third-party script count, their gzip bytes) for a cold load."""
+    headers = {'Accept-Encoding': 'gzip'}
+    response = client.get('/' + page, headers=headers)
+    body = response.data
+    html = gzip.decompress(body).decode() if response.content_encoding == 'gzip' else body.decode()
+    local, external, external_bytes = len(body), 0, 0
+    for url in dict.fromkeys(REFERENCE.findall(html)):
+        if url.startswith(('http://', 'https://', '//')):
+            if url.endswith('.css') or 'fonts.googleapis' in url:
+                continue
+            external += 1
+            external_bytes += cdn_size(url, cdn_sizes) if cdn_sizes is not None else 0
+        elif url.endswith(('.js', '.css')):
+            local += len(client.get('/' + url.lstrip('/'), headers=headers).data)
+    return local, external, external_bytes
+
+def serve_time(client, path, repeat, headers):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(path, headers=headers)
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='serves per page and mode (best is reported)')
+    parser.add_argument('--cdn-sizes', action='store_true', help='download third-party scripts to size them')
+    args = parser.parse_args()
+
+    built = app_module.static_assets
+    if not built:
+        raise SystemExit(f'No build in {app_module.ASSET_BUILD_DIR}; run `flask --app app build-assets --tailwind` first')
+    pages = sorted(path for path in built if path.endswith('.html'))
+    client = app_module.app.test_client()
+    cdn_sizes = {} if args.cdn_sizes else None
+    gzip_only = {'Accept-Encoding': 'gzip'}
+
+    rows = []
+    for mode, manifest in (('before', {}), ('after', built)):
+        app_module.static_assets = manifest
+        for i, page in enumerate(pages):
+            weight = page_weight(client, page, cdn_sizes)
+            elapsed = serve_time(client, '/' + page, args.repeat, gzip_only)
+            if mode == 'before':
+                rows.append([page, *weight, elapsed])
+            else:
+                etag = client.get('/' + page, headers=gzip_only).headers['ETag']
+                revalidate = serve_time(client, '/' + page, args.repeat, {**gzip_only, 'If-None-Match': etag})
+                rows[i] += [*weight, elapsed, revalidate]
+    app_module.static_assets = built
+
+    print(f'{"page":<24}{"local KB":>18}{"3rd-party":>12}{"3rd KB":>16}{"serve ms":>16}{"304 ms":>8}')
+    totals = [0] * 9
+    for page, *values in rows:
+        totals = [t + v for t, v in zip(totals, values)]
+        b_local, b_ext, b_ext_bytes, b_ms, a_local, a_ext, a_ext_bytes, a_ms, revalidate = values
+        print(f'{page:<24}{b_local / 1024:>8.1f} -> {a_local / 1024:>6.1f}{b_ext:>5} -> {a_ext:<3}'
+              f'{b_ext_bytes / 1024:>7.1f} -> {a_ext_bytes / 1024:<6.1f}{b_ms:>6.2f} -> {a_ms:<6.2f}{revalidate:>6.2f}')
+    b_local, b_ext, b_ext_bytes, b_ms, a_local, a_ext, a_ext_bytes, a_ms, revalidate = totals
+    print(f'{"total":<24}{b_local / 1024:>8.1f} -> {a_local / 1024:>6.1f}{b_ext:>5} -> {a_ext:<3}'
+          f'{b_ext_bytes / 1024:>7.1f} -> {a_ext_bytes / 1024:<6.1f}{b_ms:>6.1f} -> {a_ms:<6.1f}{revalidate:>6.1f}')
+    if cdn_sizes is None:
+        print('\n3rd-party bytes need --cdn-sizes (network access)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Single vs batch trade deletion benchmark.
+
+Runs the app in-process against a throwaway SQLite database, seeds N closed
+demo trades for one user, deletes them one request at a time through
+DELETE /api/trades/<id>, then seeds them again and removes them with a single
+POST /api/trades/bulk-delete call. Checks the trading summary matches the
+Trade table after each run.
+
+    python benchmarks/bench_bulk_delete.py --trades 10000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+workdir = tempfile.mkdtemp(prefix='bench-bulk-delete-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+os.environ.setdefault('DEMO_EXPIRY_SCHEDULER', '0')
+os.environ.setdefault('MARKET_DATA_PROVIDER', 'fixture')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from app import app, db, rebuild_trading_summaries, summarize_trades
+from models import Trade, TradingSummary, User
+
+def seed(user_id, count, rng):
+    start = datetime(2024, 1, 1)
+    rows = [{
+        'user_id': user_id,
+        'symbol': rng.choice(('BTC/USD', 'ETH/USD', 'EUR/USD')),
+        'trade_type': rng.choice(('buy', 'sell')),
+        'amount': 100.0,
+        'entry_price': 1.0,
+        'exit_price': 1.0,
+        'profit_loss': round(rng.uniform(-50, 50), 2),
+        'leverage': 1,
+        'status': 'closed',
+        'is_demo': True,
+        'created_at': start + timedelta(seconds=i),
+        'closed_at': start + timedelta(seconds=i + 60),
+    } for i in range(count)]
+    with app.app_context():
+        db.session.execute(insert(Trade), rows)
+        rebuild_trading_summaries(user_id)
+        db.session.commit()
+        return [t.id for t in Trade.query.with_entities(Trade.id).filter_by(user_id=user_id)]
+
+def check_summary(user_id):
+    with app.app_context():
+        expected = summarize_trades(user_id).get((user_id, True), {}).get('closed_trades', 0)
+        stored = TradingSummary.query.filter_by(user_id=user_id, is_demo=True).one().closed_trades
+        remaining = Trade.query.filter_by(user_id=user_id).count()
+    return remaining == 0 and expected == stored == 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trades', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    client = app.test_client()
+    response = client.post('/api/auth/register', json={
+        'username': 'bench', 'email': 'bench@bench.local', 'password': 'bench-password'
+    })
+    if response.status_code != 200:
+        raise SystemExit(f'Registration failed with HTTP {response.status_code}')
+    with app.app_context():
+        user_id = User.query.filter_by(username='bench').one().id
+
+    ids = seed(user_id, args.trades, rng)
+    started = time.perf_counter()
+    for trade_id in ids:
+        if client.delete(f'/api/trades/{trade_id}').status_code != 200:
+            raise SystemExit(f'Single delete of trade {trade_id} failed')
+    single = time.perf_counter() - started
+    single_ok = check_summary(user_id)
+
+    ids = seed(user_id, args.trades, rng)
+    started = time.perf_counter()
+    response = client.post('/api/trades/bulk-delete', json={'ids': ids})
+    batch = time.perf_counter() - started
+    if response.status_code != 200 or response.get_json()['deleted'] != len(ids):
+        raise SystemExit(f'Bulk delete failed: {response.get_json()}')
+    batch_ok = check_summary(user_id)
+
+    print(f'trades: {args.trades}')
+    print(f'single deletes: {single:8.3f}s  ({args.trades / single:,.0f} trades/s)  summary ok: {single_ok}')
+    print(f'batch delete:   {batch:8.3f}s  ({args.trades / batch:,.0f} trades/s)  summary ok: {batch_ok}')
+    print(f'speedup: {single / batch:.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Write throughput per database configuration.
+
+Runs benchmarks/bench_transfers.py once per configuration and worker count,
+each against a fresh database, and prints a throughput table. The SQLite
+configurations compare the stock rollback journal with the WAL pragmas app.py
+applies on connect; pass --postgres-url (an empty throwaway database) to add a
+PostgreSQL row.
+
+    python benchmarks/bench_db_writes.py --workers 1,2,4,8 --transfers 4000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_transfers.py')
+
+CONFIGS = {
+    'sqlite rollback journal': {
+        'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_MMAP_SIZE': '0', 'SQLITE_BUSY_TIMEOUT_MS': '5000',
+    },
+    'sqlite WAL (app default)': {},
+}
+
+def run(env_overrides, workers, threads, transfers):
+    env = {k: v for k, v in os.environ.items() if not k.startswith('SQLITE_') and k != 'DATABASE_URL'}
+    env.update(env_overrides)
+    env.setdefault('DB_POOL_SIZE', str(threads))
+    output = subprocess.run(
+        [sys.executable, BENCH, '--json', '--processes', str(workers), '--threads', str(threads), '--transfers', str(transfers)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4,8', help='comma-separated worker process counts')
+    parser.add_argument('--threads', type=int, default=1, help='threads per worker')
+    parser.add_argument('--transfers', type=int, default=4000)
+    parser.add_argument('--postgres-url', help='DATABASE_URL of an empty PostgreSQL database to include')
+    args = parser.parse_args()
+
+    configs = dict(CONFIGS)
+    if args.postgres_url:
+        configs['postgresql'] = {'DATABASE_URL': args.postgres_url}
+
+    print(f'{"configuration":<28}{"workers":>8}{"req/s":>10}{"errors":>8}  conserved')
+    for label, overrides in configs.items():
+        for workers in (int(w) for w in args.workers.split(',')):
+            result = run(overrides, workers, args.threads, args.transfers)
+            errors = sum(n for outcome, n in result['outcomes'].items() if outcome not in ('completed', 'insufficient'))
+            print(f'{label:<28}{workers:>8}{result["throughput"]:>10,.0f}{errors:>8}  {result["conserved"] and result["non_negative"]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Query-time benchmark for the composite indexes declared in models.py.
+
+Seeds a throwaway SQLite database with N trades/notifications/transactions,
+times the per-user queries the API runs without the indexes, then creates
+them and times the same queries again.
+
+    python benchmarks/bench_indexes.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select
+
+from app import db
+from models import Trade, Notification, Transaction
+
+CHUNK = 50000
+
+QUERIES = {
+    'trades (GET /api/trades)': lambda uid: select(Trade).where(
+        Trade.user_id == uid, Trade.is_demo == False, Trade.status == 'open'
+    ).order_by(Trade.created_at.desc()),
+    'closed trades (GET /api/trades/all-history)': lambda uid: select(Trade).where(
+        Trade.user_id == uid, Trade.status == 'closed'
+    ).order_by(Trade.closed_at.desc()),
+    'demo history (GET /api/demo/history)': lambda uid: select(Trade).where(
+        Trade.user_id == uid, Trade.is_demo == True, Trade.status == 'closed'
+    ).order_by(Trade.closed_at.desc()).limit(50),
+    'notifications (GET /api/notifications)': lambda uid: select(Notification).where(
+        Notification.user_id == uid
+    ).order_by(Notification.created_at.desc()).limit(20),
+    'transactions (GET /api/transactions?type=deposit)': lambda uid: select(Transaction).where(
+        Transaction.user_id == uid, Transaction.type == 'deposit'
+    ).order_by(Transaction.created_at.desc()).limit(20),
+}
+
+def seed(engine, rows, users, rng):
+    start = datetime(2024, 1, 1)
+    tables = (
+        (Trade.__table__, lambda i: {
+            'user_id': rng.randint(1, users),
+            'symbol': rng.choice(('BTC/USD', 'ETH/USD', 'EUR/USD', 'AAPL')),
+            'trade_type': rng.choice(('buy', 'sell')),
+            'amount': 100.0,
+            'entry_price': 1.0,
+            'profit_loss': rng.uniform(-50, 50),
+            'leverage': 1,
+            'status': 'open' if rng.random() < 0.05 else 'closed',
+            'is_demo': rng.random() < 0.5,
+            'created_at': start + timedelta(seconds=i),
+            'closed_at': start + timedelta(seconds=i + 60),
+        }),
+        (Notification.__table__, lambda i: {
+            'user_id': rng.randint(1, users),
+            'title': 'Trade Opened',
+            'message': 'benchmark',
+            'created_at': start + timedelta(seconds=i),
+        }),
+        (Transaction.__table__, lambda i: {
+            'user_id': rng.randint(1, users),
+            'type': rng.choice(('deposit', 'withdrawal', 'transfer')),
+            'amount': 100.0,
+            'status': rng.choice(('pending', 'completed')),
+            'created_at': start + timedelta(seconds=i),
+        }),
+    )
+    with engine.begin() as conn:
+        for table, make_row in tables:
+            for offset in range(0, rows, CHUNK):
+                conn.execute(insert(table), [make_row(i) for i in range(offset, min(offset + CHUNK, rows))])
+
+def time_queries(engine, users, samples, rng):
+    results = {}
+    user_ids = [rng.randint(1, users) for _ in range(samples)]
+    with engine.connect() as conn:
+        for name, build in QUERIES.items():
+            started = time.perf_counter()
+            for uid in user_ids:
+                conn.execute(build(uid)).fetchall()
+            results[name] = (time.perf_counter() - started) / samples * 1000
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000, help='rows per table')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--samples', type=int, default=50, help='queries timed per access path')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    path = os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')
+    engine = create_engine('sqlite:///' + path)
+    tables = [Trade.__table__, Notification.__table__, Transaction.__table__]
+
+    db.metadata.create_all(engine, tables=tables)
+    for table in tables:
+        for index in table.indexes:
+            index.drop(bind=engine)
+
+    print(f'Seeding {args.rows:,} rows per table into {path} ...')
+    started = time.perf_counter()
+    seed(engine, args.rows, args.users, rng)
+    print(f'  seeded in {time.perf_counter() - started:.1f}s')
+
+    before = time_queries(engine, args.users, args.samples, rng)
+
+    started = time.perf_counter()
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+    print(f'  indexes built in {time.perf_counter() - started:.1f}s')
+
+    after = time_queries(engine, args.users, args.samples, rng)
+
+    print(f"\n{'query':<52}{'no index (ms)':>15}{'indexed (ms)':>15}{'speedup':>10}")
+    for name in QUERIES:
+        print(f'{name:<52}{before[name]:>15.3f}{after[name]:>15.3f}{before[name] / after[name]:>9.0f}x')
+
+    engine.dispose()
+    os.remove(path)
+
+if __name__ == '__main__':
+    main()
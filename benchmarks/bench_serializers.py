@@ -0,0 +1,142 @@
+"""
+Serialization benchmark for large list responses.
+
+Seeds a throwaway SQLite database with one user holding --rows live trades
+and times building the GET /api/trades payload three ways: full ORM instances
+encoded by hand-written dicts and the stdlib json module (how the endpoints
+used to work), column-projected rows through serializers.TRADE with the
+stdlib, and the same rows encoded with orjson when it is installed. Then
+times the real endpoint through the Flask test client with each JSON
+provider, so the numbers include routing, the query and the response.
+
+    python benchmarks/bench_serializers.py --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-serializers-'), 'bench.db')
+os.environ.setdefault('DEMO_EXPIRY_SCHEDULER', '0')
+os.environ.setdefault('MARKET_DATA_PROVIDER', 'fixture')
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.security import generate_password_hash
+
+from app import app, db
+from models import User, Trade
+import serializers
+
+PASSWORD = 'bench-password'
+
+def legacy_trades(user_id):
+    trades = Trade.query.filter_by(user_id=user_id, is_demo=False).order_by(Trade.created_at.desc()).all()
+    return [{
+        'id': t.id,
+        'symbol': t.symbol,
+        'trade_type': t.trade_type,
+        'amount': t.amount,
+        'entry_price': t.entry_price,
+        'exit_price': t.exit_price,
+        'profit_loss': t.profit_loss,
+        'leverage': t.leverage,
+        'status': t.status,
+        'created_at': t.created_at.isoformat(),
+        'closed_at': t.closed_at.isoformat() if t.closed_at else None
+    } for t in trades]
+
+def projected_trades(user_id):
+    rows = db.session.query(*serializers.TRADE.columns).filter(
+        Trade.user_id == user_id, Trade.is_demo == False
+    ).order_by(Trade.created_at.desc()).all()
+    return serializers.TRADE.rows(rows)
+
+def stdlib_dumps(payload):
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+
+def orjson_dumps(payload):
+    return serializers.orjson.dumps(payload, option=serializers.OrjsonProvider.option)
+
+def seed(rows):
+    user = User(username='benchuser', email='bench@example.com', password_hash=generate_password_hash(PASSWORD))
+    db.session.add(user)
+    db.session.flush()
+    start = datetime(2024, 1, 1)
+    db.session.execute(db.insert(Trade), [{
+        'user_id': user.id,
+        'symbol': ('BTC/USD', 'ETH/USD', 'EUR/USD', 'AAPL')[i % 4],
+        'trade_type': 'buy' if i % 2 else 'sell',
+        'amount': 100.0 + i % 50,
+        'entry_price': 1.0 + i / 1000,
+        'exit_price': None if i % 10 == 0 else 1.1 + i / 1000,
+        'profit_loss': (i % 21 - 10) * 1.5,
+        'leverage': 1 + i % 5,
+        'status': 'open' if i % 10 == 0 else 'closed',
+        'is_demo': False,
+        'created_at': start + timedelta(seconds=i),
+        'closed_at': None if i % 10 == 0 else start + timedelta(seconds=i + 60),
+    } for i in range(rows)])
+    db.session.commit()
+    return user.id
+
+def best_of(repeat, fn):
+    """Fastest of repeat runs in ms; each run starts from an empty session."""
+    times = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='trades in the response')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per variant (best is reported)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        user_id = seed(args.rows)
+
+        variants = [
+            ('ORM + dicts + json', lambda: stdlib_dumps(legacy_trades(user_id))),
+            ('rows + Serializer + json', lambda: stdlib_dumps(projected_trades(user_id))),
+        ]
+        if serializers.orjson:
+            variants.append(('rows + Serializer + orjson', lambda: orjson_dumps(projected_trades(user_id))))
+
+        print(f'{args.rows:,} trades, best of {args.repeat}\n')
+        print(f'{"payload":<32}{"ms":>10}{"bytes":>12}')
+        baseline = None
+        for label, fn in variants:
+            elapsed, body = best_of(args.repeat, fn)
+            if baseline is None:
+                baseline = json.loads(body)
+            elif json.loads(body) != baseline:
+                raise SystemExit(f'{label} produced a different payload')
+            print(f'{label:<32}{elapsed:>10.1f}{len(body):>12,}')
+
+    providers = [('GET /api/trades (stdlib json)', DefaultJSONProvider(app))]
+    if serializers.orjson:
+        providers.append(('GET /api/trades (orjson)', serializers.OrjsonProvider(app)))
+    client = app.test_client()
+    login = client.post('/api/auth/login', json={'email': 'bench@example.com', 'password': PASSWORD})
+    if login.status_code != 200:
+        raise SystemExit(f'Login failed: {login.status_code}')
+    print()
+    for label, provider in providers:
+        app.json = provider
+        with app.app_context():
+            elapsed, response = best_of(args.repeat, lambda: client.get('/api/trades'))
+        if len(response.get_json()['trades']) != args.rows:
+            raise SystemExit(f'{label} returned the wrong number of trades')
+        print(f'{label:<32}{elapsed:>10.1f}{len(response.data):>12,}')
+
+if __name__ == '__main__':
+    main()
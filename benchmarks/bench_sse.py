@@ -0,0 +1,94 @@
+"""
+Load test for the /api/stream server-sent-events endpoint.
+
+Registers a throwaway user on a running server, opens N concurrent stream
+connections with that session and reports how many stayed connected, how many
+quote ticks each received and the tick delivery lag.
+
+    MARKET_DATA_PROVIDER=fixture STREAM_TICK_SECONDS=1 \\
+        gunicorn app:app -k gthread -w 1 --threads 1000 --bind 127.0.0.1:5000
+    python benchmarks/bench_sse.py --url http://127.0.0.1:5000 --clients 500 --duration 30
+"""
+import argparse
+import http.client
+import json
+import secrets
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+def register(host, port):
+    name = f'sse{secrets.token_hex(4)}'
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    body = json.dumps({'username': name, 'email': f'{name}@bench.local', 'password': secrets.token_hex(8)})
+    conn.request('POST', '/api/auth/register', body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    if response.status != 200:
+        raise SystemExit(f'Registration failed with HTTP {response.status}')
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+def run_client(host, port, cookie, symbols, deadline, result):
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        conn.request('GET', f'/api/stream?symbols={symbols}', headers={'Cookie': cookie, 'Accept': 'text/event-stream'})
+        response = conn.getresponse()
+        if response.status != 200:
+            result['error'] = f'HTTP {response.status}'
+            return
+        result['connected'] = True
+        event = None
+        while time.time() < deadline:
+            line = response.fp.readline()
+            if not line:
+                break
+            line = line.decode().rstrip('\n')
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: ') and event == 'quote':
+                result['ticks'] += 1
+                result['lags'].append(time.time() - json.loads(line[6:])['ts'])
+        conn.close()
+    except Exception as e:
+        result['error'] = str(e)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30, help='seconds each client stays subscribed')
+    parser.add_argument('--symbols', default='BTC/USD,ETH/USD')
+    args = parser.parse_args()
+
+    target = urlsplit(args.url)
+    cookie = register(target.hostname, target.port or 80)
+
+    deadline = time.time() + args.duration
+    results = [{'connected': False, 'ticks': 0, 'lags': [], 'error': None} for _ in range(args.clients)]
+    threads = [
+        threading.Thread(target=run_client, args=(target.hostname, target.port or 80, cookie, args.symbols, deadline, r), daemon=True)
+        for r in results
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(args.duration + 30)
+
+    lags = sorted(lag for r in results for lag in r['lags'])
+    ticks = [r['ticks'] for r in results if r['connected']]
+    errors = [r['error'] for r in results if r['error']]
+    print(json.dumps({
+        'clients': args.clients,
+        'connected': len(ticks),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'duration_s': args.duration,
+        'ticks_per_client_min': min(ticks) if ticks else 0,
+        'ticks_per_client_mean': statistics.mean(ticks) if ticks else 0,
+        'lag_p50_ms': lags[len(lags) // 2] * 1000 if lags else None,
+        'lag_p99_ms': lags[int(len(lags) * 0.99)] * 1000 if lags else None
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
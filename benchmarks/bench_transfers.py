@@ -0,0 +1,144 @@
+"""
+Concurrent transfer benchmark for the conditional balance updates.
+
+Runs the app in-process against a throwaway SQLite database, registers one
+account per thread with --balance each, then forks --processes workers with
+--threads threads apiece. Every thread logs in as its own user and fires
+POST /api/transfer at the other users until --transfers requests have been
+sent in total. Reports throughput, the outcome mix and whether the total
+balance across all accounts was conserved and stayed non-negative.
+
+    python benchmarks/bench_transfers.py --transfers 5000 --processes 4 --threads 8
+
+Set DATABASE_URL to run against another database; the benchmark only touches
+the accounts it registers.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+if 'DATABASE_URL' not in os.environ:
+    workdir = tempfile.mkdtemp(prefix='bench-transfers-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+os.environ.setdefault('DEMO_EXPIRY_SCHEDULER', '0')
+os.environ.setdefault('MARKET_DATA_PROVIDER', 'fixture')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import Account, User
+
+PASSWORD = 'bench-password'
+
+def account_totals(names):
+    with app.app_context():
+        total, lowest = db.session.query(db.func.sum(Account.balance), db.func.min(Account.balance)).join(
+            User, User.id == Account.user_id
+        ).filter(User.username.in_(names)).one()
+    return total or 0.0, lowest or 0.0
+
+def seed(users, balance):
+    client = app.test_client()
+    run_id = secrets.token_hex(3)
+    names = []
+    for i in range(users):
+        name = f'bench{run_id}x{i}'
+        response = client.post('/api/auth/register', json={
+            'username': name, 'email': f'{name}@bench.local', 'password': PASSWORD
+        })
+        if response.status_code != 200:
+            raise SystemExit(f'Registration failed with HTTP {response.status_code}')
+        client.post('/api/auth/logout')
+        names.append(name)
+    with app.app_context():
+        Account.query.filter(Account.user_id.in_(
+            db.select(User.id).where(User.username.in_(names))
+        )).update({'balance': balance}, synchronize_session=False)
+        db.session.commit()
+    return names
+
+def run_thread(name, names, count, seed, counts):
+    rng = random.Random(seed)
+    counts = counts.setdefault(threading.get_ident(), Counter())
+    client = app.test_client()
+    if client.post('/api/auth/login', json={'email': name, 'password': PASSWORD}).status_code != 200:
+        counts['login failed'] += 1
+        return
+    for _ in range(count):
+        recipient = rng.choice(names)
+        response = client.post('/api/transfer', json={'recipient': recipient, 'amount': rng.randint(1, 50)})
+        if response.status_code == 200:
+            counts['completed'] += 1
+        elif response.status_code == 400:
+            counts['insufficient'] += 1
+        else:
+            counts[f'http {response.status_code}'] += 1
+
+def run_process(index, names, threads, per_thread, results):
+    with app.app_context():
+        db.engine.dispose()
+    per_thread_counts = {}
+    workers = [
+        threading.Thread(target=run_thread, args=(names[index * threads + i], names, per_thread, index * 1000 + i, per_thread_counts))
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put(dict(sum(per_thread_counts.values(), Counter())))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--balance', type=float, default=500.0)
+    parser.add_argument('--transfers', type=int, default=5000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help='print one JSON object instead of a report')
+    args = parser.parse_args()
+
+    names = seed(args.processes * args.threads, args.balance)
+    before, _ = account_totals(names)
+    per_thread = max(1, args.transfers // (args.processes * args.threads))
+
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    started = time.perf_counter()
+    processes = [
+        ctx.Process(target=run_process, args=(i, names, args.threads, per_thread, results))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    counts = Counter()
+    for _ in processes:
+        counts.update(results.get())
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    after, lowest = account_totals(names)
+    sent = sum(counts.values())
+    if args.json:
+        print(json.dumps({
+            'sent': sent, 'elapsed': elapsed, 'throughput': sent / elapsed, 'outcomes': counts,
+            'conserved': abs(before - after) < 1e-6, 'non_negative': lowest >= 0
+        }))
+        return
+    print(f'transfers sent: {sent} ({args.processes} processes x {args.threads} threads)')
+    print(f'elapsed: {elapsed:.2f}s  throughput: {sent / elapsed:,.0f} req/s')
+    for outcome, count in sorted(counts.items()):
+        print(f'  {outcome}: {count}')
+    print(f'total balance before: {before:,.2f}  after: {after:,.2f}  conserved: {abs(before - after) < 1e-6}')
+    print(f'lowest balance: {lowest:,.2f}  non-negative: {lowest >= 0}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+End-to-end API load test.
+
+Seeds a throwaway database with benchmarks/seed.py (SQLite by default, or
+--database-url for an empty PostgreSQL database), starts the app under
+gunicorn on a local port and runs --clients simulated users against it for
+--duration seconds. Each client logs in as its own seeded user and picks
+endpoints from a weighted mix of dashboard, transaction and trade reads,
+transfers and demo trades; one client in --admin-every is the admin and polls
+the deposits listing instead. Prints p50/p95/p99 latency and throughput per
+endpoint as JSON, so runs can be compared across commits. Needs no network
+access beyond loopback.
+
+    python benchmarks/loadtest.py --users 2000 --clients 16 --duration 30 --output results.json
+
+Pass --url to drive a server that is already running against a database
+seeded with the same --users (seeding is skipped).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED = os.path.join(ROOT, 'benchmarks', 'seed.py')
+PASSWORD = 'bench-password'
+
+# (name, weight, method, path, body factory)
+SCENARIOS = (
+    ('dashboard', 30, 'GET', '/api/dashboard', None),
+    ('transactions', 20, 'GET', '/api/transactions', None),
+    ('trades', 20, 'GET', '/api/trades', None),
+    ('all-history', 10, 'GET', '/api/trades/all-history', None),
+    ('transfer', 10, 'POST', '/api/transfer', lambda client: {
+        'recipient': f'user{client.rng.randint(client.first_user + 1, client.last_user)}',
+        'amount': client.rng.randint(1, 20),
+    }),
+    ('demo-trade', 10, 'POST', '/api/demo/trade', lambda client: {
+        'symbol': 'BTC/USD', 'trade_type': client.rng.choice(('buy', 'sell')),
+        'amount': 10, 'entry_price': 100.0, 'expiry_seconds': 3600,
+    }),
+)
+ADMIN_SCENARIOS = (
+    ('admin-deposits', 1, 'GET', '/api/admin/deposits', None),
+)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class Client:
+    """One simulated user on a keep-alive connection with its session cookie."""
+
+    def __init__(self, host, port, username, scenarios, first_user, last_user, seed):
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.username = username
+        self.scenarios = scenarios
+        self.weights = [weight for _, weight, *_ in scenarios]
+        self.first_user = first_user
+        self.last_user = last_user
+        self.rng = random.Random(seed)
+        self.cookie = None
+        self.latencies = {}
+        self.statuses = Counter()
+
+    def request(self, method, path, body=None):
+        headers = {'Accept': 'application/json'}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return None
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status
+
+    def login(self):
+        return self.request('POST', '/api/auth/login', {'email': self.username, 'password': PASSWORD}) == 200
+
+    def run(self, deadline):
+        while time.perf_counter() < deadline:
+            name, _, method, path, body = self.rng.choices(self.scenarios, self.weights)[0]
+            started = time.perf_counter()
+            status = self.request(method, path, body(self) if body else None)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.latencies.setdefault(name, []).append(elapsed)
+            self.statuses[(name, status or 'error')] += 1
+
+def summarize(latencies, statuses, elapsed):
+    def stats(values, errors):
+        values = sorted(values)
+        return {
+            'requests': len(values),
+            'errors': errors,
+            'throughput': round(len(values) / elapsed, 2),
+            'mean_ms': round(sum(values) / len(values), 3) if values else None,
+            'p50_ms': round(percentile(values, 0.50), 3) if values else None,
+            'p95_ms': round(percentile(values, 0.95), 3) if values else None,
+            'p99_ms': round(percentile(values, 0.99), 3) if values else None,
+        }
+
+    # 400s on transfers and demo trades are expected business outcomes (insufficient balance)
+    errors = Counter()
+    for (name, status), count in statuses.items():
+        if status == 'error' or (status >= 400 and status != 400):
+            errors[name] += count
+    endpoints = {name: stats(values, errors[name]) for name, values in sorted(latencies.items())}
+    overall = stats([v for values in latencies.values() for v in values], sum(errors.values()))
+    status_counts = {}
+    for (name, status), count in sorted(statuses.items(), key=str):
+        status_counts.setdefault(name, {})[str(status)] = count
+    return endpoints, overall, status_counts
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(host, port, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with code {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=2)
+            connection.request('GET', '/api/auth/check')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('Timed out waiting for the app to start')
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000, help='users to seed')
+    parser.add_argument('--transactions', type=int, default=20, help='seeded per user')
+    parser.add_argument('--trades', type=int, default=20, help='seeded per user')
+    parser.add_argument('--notifications', type=int, default=10, help='seeded per user')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent simulated users')
+    parser.add_argument('--admin-every', type=int, default=8, help='make one client in N an admin (0 for none)')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds of load')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--database-url', help='empty database to seed instead of a temporary SQLite file')
+    parser.add_argument('--url', help='drive an already running server instead of starting gunicorn')
+    parser.add_argument('--first-user', type=int, default=1, help='first seeded user id when --url is given')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+        first_user = args.first_user
+    else:
+        database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'bench.db')
+        env = dict(os.environ, DATABASE_URL=database_url, MARKET_DATA_PROVIDER='fixture')
+        env.setdefault('DEMO_EXPIRY_SCHEDULER', '0')
+        started = time.perf_counter()
+        output = subprocess.run([
+            sys.executable, SEED, '--users', str(args.users), '--transactions', str(args.transactions),
+            '--trades', str(args.trades), '--notifications', str(args.notifications), '--seed', str(args.seed),
+        ], env=env, capture_output=True, text=True, check=True).stdout
+        print(output.strip(), f'(seeding took {time.perf_counter() - started:.1f}s)', file=sys.stderr)
+        first_user = int(output.split('seeded users ', 1)[1].split('-', 1)[0])
+
+        host, port = '127.0.0.1', free_port()
+        server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', '--bind', f'{host}:{port}', '--workers', str(args.workers),
+            '--threads', str(args.threads), '--worker-class', 'gthread', '--graceful-timeout', '5', '--log-level', 'warning', 'app:app',
+        ], cwd=ROOT, env=env)
+
+    clients = []
+    try:
+        if server:
+            wait_for_server(host, port, server)
+        last_user = first_user + args.users - 1
+        for i in range(args.clients):
+            admin = args.admin_every and i % args.admin_every == 0
+            # first_user is the admin; regular clients use distinct non-admin users
+            username = 'benchadmin' if admin else f'user{first_user + 1 + i % (args.users - 1)}'
+            client = Client(host, port, username, ADMIN_SCENARIOS if admin else SCENARIOS,
+                            first_user, last_user, args.seed * 1000 + i)
+            if not client.login():
+                raise SystemExit(f'Login failed for {username}')
+            clients.append(client)
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=client.run, args=(deadline,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        for client in clients:
+            client.connection.close()
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    latencies, statuses = {}, Counter()
+    for client in clients:
+        for name, values in client.latencies.items():
+            latencies.setdefault(name, []).extend(values)
+        statuses.update(client.statuses)
+    endpoints, overall, status_counts = summarize(latencies, statuses, elapsed)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'config': {
+            'users': args.users, 'transactions': args.transactions, 'trades': args.trades,
+            'notifications': args.notifications, 'clients': args.clients, 'admin_every': args.admin_every,
+            'duration': args.duration, 'workers': args.workers, 'threads': args.threads,
+            'database': 'external' if args.url else ('postgresql' if args.database_url else 'sqlite'),
+        },
+        'elapsed': round(elapsed, 3),
+        'overall': overall,
+        'endpoints': endpoints,
+        'statuses': status_counts,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""
+Deterministic synthetic data generator for benchmarking at production scale.
+
+Writes users with accounts and referral codes, deposit and withdrawal
+lifecycles (pending, completed, rejected), transfers between users, live and
+demo trades, notifications and the matching trading summaries. Balances are
+consistent with the history: an account's balance is its completed deposits
+minus completed withdrawals, plus transfers in, minus transfers out and open
+live stakes, plus closed live P/L, and no running balance goes negative.
+`flask --app app rebuild-trade-summaries --check` and
+`flask --app app verify-ledger` both pass on a freshly seeded database.
+
+History spans the HISTORY_DAYS before --now (default the current time).
+Users are generated in blocks of BLOCK_USERS, each from its own generator
+seeded with (--seed, block), so the same --seed and --now give an identical
+dataset for any --jobs (only the password hash's salt differs). Blocks are
+built in --jobs forked processes and written in order by the parent with
+one executemany per --chunk rows on the raw DBAPI connection (execute_values
+on PostgreSQL), skipping the ORM. Secondary indexes on the seeded tables are
+dropped for the load and rebuilt once at the end. Users get explicit ids so
+every foreign key is known while generating; the first seeded user is the
+admin 'benchadmin' and every other user is user<id>, all with the password
+in PASSWORD.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/seed.py --users 200000 --jobs 8
+
+--transactions, --trades and --notifications are per-user averages; each
+user draws between 0 and twice the average.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DEMO_EXPIRY_SCHEDULER', '0')
+os.environ.setdefault('MARKET_DATA_PROVIDER', 'fixture')
+
+from werkzeug.security import generate_password_hash
+
+from app import app, db, snapshot_unledgered_accounts, CRYPTO_WALLETS, SUMMARY_COLUMNS
+from models import User, Account, Referral, Transaction, Trade, Notification, TradingSummary
+
+PASSWORD = 'bench-password'
+ADMIN_USERNAME = 'benchadmin'
+DEMO_BALANCE = 10000.0
+HISTORY_DAYS = 365
+BLOCK_USERS = 1000
+SQLITE_CACHE_KB = 512 * 1024
+SIDES = ('buy', 'sell')
+LEVERAGES = (1, 1, 2, 5, 10)
+SYMBOLS = ('BTC/USD', 'ETH/USD', 'EUR/USD', 'GBP/USD', 'USD/JPY', 'AAPL', 'TSLA', 'XAU/USD')
+COUNTRIES = ('United States', 'United Kingdom', 'Nigeria', 'Germany', 'India', 'Brazil', 'Canada', 'Kenya')
+NOTIFICATIONS = (
+    ('Welcome to PipMatrix', 'Your account is ready. Fund it to start trading.', 'info'),
+    ('Market Alert', 'Volatility is elevated on the major pairs today.', 'warning'),
+    ('Security Notice', 'A new login to your account was detected.', 'info'),
+    ('Deposit Approved', 'Your deposit has been approved and credited to your account.', 'success'),
+    ('Withdrawal Approved', 'Your withdrawal has been approved and processed.', 'success'),
+    ('Trade Closed', 'One of your trades was closed.', 'success'),
+)
+
+# Insert order within a block respects the foreign keys
+COLUMNS = {
+    User: ('id', 'username', 'email', 'password_hash', 'full_name', 'phone', 'country',
+           'is_verified', 'is_premium', 'is_admin', 'created_at', 'last_login'),
+    Account: ('user_id', 'balance', 'demo_balance', 'total_profit', 'total_deposits',
+              'total_withdrawals', 'account_type', 'created_at'),
+    Referral: ('referrer_id', 'referred_user_id', 'referral_code', 'bonus_earned', 'status', 'created_at'),
+    Transaction: ('user_id', 'type', 'amount', 'status', 'payment_method', 'wallet_address', 'reference',
+                  'description', 'crypto_type', 'crypto_network', 'txid', 'admin_notes', 'created_at',
+                  'completed_at'),
+    Trade: ('user_id', 'symbol', 'trade_type', 'amount', 'entry_price', 'exit_price', 'profit_loss',
+            'leverage', 'status', 'is_demo', 'created_at', 'closed_at', 'expires_at'),
+    Notification: ('user_id', 'title', 'message', 'type', 'read', 'created_at'),
+    TradingSummary: ('user_id', 'is_demo', *SUMMARY_COLUMNS, 'updated_at'),
+}
+
+class BulkWriter:
+    """
+    Writes lists of row tuples with one executemany per chunk rows. Rows list
+    values in the order of COLUMNS for their model. Secondary indexes on the
+    seeded tables are dropped up front and rebuilt in one pass by finish(),
+    which is much cheaper than maintaining them row by row.
+    """
+
+    def __init__(self, connection, chunk):
+        self.chunk = chunk
+        self.connection = connection
+        self.cursor = connection.connection.cursor()
+        dialect = connection.dialect
+        self.postgres = dialect.name == 'postgresql'
+        self.statements = {}
+        self.indexes = []
+        self.counts = Counter()
+        if self.postgres:
+            from psycopg2.extras import execute_values
+            self.execute_values = execute_values
+        else:
+            # Index pages for tens of millions of rows do not fit SQLite's default 2MB page cache
+            self.cursor.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_KB}')
+
+        quote = dialect.identifier_preparer.quote
+        for model, columns in COLUMNS.items():
+            names = ', '.join(quote(column) for column in columns)
+            values = '%s' if self.postgres else '(' + ', '.join('?' * len(columns)) + ')'
+            self.statements[model.__tablename__] = f'INSERT INTO {quote(model.__tablename__)} ({names}) VALUES {values}'
+            for index in model.__table__.indexes:
+                if not index.unique:
+                    index.drop(bind=connection, checkfirst=True)
+                    self.indexes.append(index)
+
+    def write(self, table, rows):
+        statement = self.statements[table]
+        for start in range(0, len(rows), self.chunk):
+            chunk = rows[start:start + self.chunk]
+            if self.postgres:
+                self.execute_values(self.cursor, statement, chunk, page_size=len(chunk))
+            else:
+                self.cursor.executemany(statement, chunk)
+        self.counts[table] += len(rows)
+
+    def finish(self):
+        for index in self.indexes:
+            index.create(bind=self.connection)
+
+def generate_block(options, block):
+    """
+    Rows for users [block * BLOCK_USERS, ...) of the run, keyed by table name.
+    Everything a block references is in the block or an earlier one:
+    referrers sign up earlier and transfers only go to later users of the
+    same block, so a user's incoming total is final when its account row is
+    built.
+    """
+    rng = random.Random(f'{options["seed"]}:{block}')
+    random_ = rng.random
+    randint = rng.randint
+    getrandbits = rng.getrandbits
+    # SQLite stores datetimes in SQLAlchemy's text format
+    stamp = (lambda value: value) if options['postgres'] else partial(datetime.isoformat, sep=' ', timespec='microseconds')
+    users, first_id, now = options['users'], options['first_id'], options['now']
+    window = HISTORY_DAYS * 86400.0
+    start = now - timedelta(days=HISTORY_DAYS)
+    event_average = options['transactions'] + options['trades']
+    trade_share = options['trades'] / event_average if event_average else 0.0
+    notifications = options['notifications']
+    wallets = list(CRYPTO_WALLETS.values())
+
+    first_offset = block * BLOCK_USERS
+    last_offset = min(users, first_offset + BLOCK_USERS) - 1
+    block_last_id = first_id + last_offset
+    incoming = [0.0] * (last_offset - first_offset + 1)
+    rows = {model.__tablename__: [] for model in COLUMNS}
+    user_rows, account_rows, referral_rows = rows['users'], rows['accounts'], rows['referrals']
+    transaction_rows, trade_rows, notification_rows = rows['transactions'], rows['trades'], rows['notifications']
+    summary_rows = rows['trading_summaries']
+
+    for offset in range(first_offset, last_offset + 1):
+        user_id = first_id + offset
+        # Signup times ascend with the user id, so referrers always predate the users they refer
+        signed_up_seconds = (offset + random_()) / users * window * 0.9
+        signed_up = start + timedelta(seconds=signed_up_seconds)
+        span = window - signed_up_seconds
+        balance = deposits = withdrawals = profit = 0.0
+        demo_balance = DEMO_BALANCE
+        summaries = {True: [0, 0.0, 0, 0, 0.0, 0.0], False: [0, 0.0, 0, 0, 0.0, 0.0]}
+
+        user_rows.append((
+            user_id,
+            ADMIN_USERNAME if offset == 0 else f'user{user_id}',
+            f'user{user_id}@bench.local',
+            options['password_hash'],
+            f'Bench User {user_id}',
+            f'+1555{user_id:07d}',
+            COUNTRIES[int(random_() * len(COUNTRIES))],
+            random_() < 0.7,
+            random_() < 0.1,
+            offset == 0,
+            stamp(signed_up),
+            stamp(now - timedelta(seconds=random_() * 30 * 86400)),
+        ))
+        referral_rows.append((user_id, None, f'PIP{user_id:08X}', 0.0, 'pending', stamp(signed_up)))
+        if offset and random_() < 0.2:
+            referral_rows.append((first_id + int(random_() * offset), user_id, None, 0.0, 'completed', stamp(signed_up)))
+
+        events = sorted(signed_up_seconds + random_() * span for _ in range(randint(0, 2 * event_average)))
+        for index, seconds in enumerate(events):
+            at = start + timedelta(seconds=seconds)
+
+            if random_() < trade_share:
+                is_demo = random_() < 0.5 or balance < 10
+                available = demo_balance if is_demo else balance
+                if available < 10:
+                    continue
+                amount = round(10 + (min(available, 500) - 10) * random_(), 2)
+                entry_price = round(1 + 49999 * random_(), 4)
+                summary = summaries[is_demo]
+                if random_() < 0.05:
+                    # Open positions are recent; demo ones expire in the future so the scheduler leaves them
+                    trade_rows.append((
+                        user_id, SYMBOLS[int(random_() * len(SYMBOLS))], SIDES[random_() < 0.5], amount, entry_price,
+                        None, 0.0, LEVERAGES[int(random_() * len(LEVERAGES))], 'open', is_demo,
+                        stamp(now - timedelta(seconds=random_() * 3600)), None,
+                        stamp(now + timedelta(seconds=300 + random_() * 6900)) if is_demo else None,
+                    ))
+                    summary[0] += 1
+                    summary[1] += amount
+                    if is_demo:
+                        demo_balance -= amount
+                    else:
+                        balance -= amount
+                    continue
+                profit_loss = round(amount * (1.85 * random_() - 1), 2)
+                trade_rows.append((
+                    user_id, SYMBOLS[int(random_() * len(SYMBOLS))], SIDES[random_() < 0.5], amount, entry_price,
+                    round(entry_price * (1 + profit_loss / amount / 10), 4), profit_loss,
+                    LEVERAGES[int(random_() * len(LEVERAGES))], 'closed', is_demo, stamp(at),
+                    stamp(at + timedelta(seconds=60 + random_() * 36000)), None,
+                ))
+                summary[2] += 1
+                if profit_loss > 0:
+                    summary[3] += 1
+                    summary[4] += profit_loss
+                elif profit_loss < 0:
+                    summary[5] -= profit_loss
+                if is_demo:
+                    demo_balance += profit_loss
+                else:
+                    balance += profit_loss
+                    profit += profit_loss
+                continue
+
+            created = stamp(at)
+            roll = random_()
+            status = 'completed' if roll < 0.85 else ('pending' if roll < 0.93 else 'rejected')
+            completed = stamp(at + timedelta(seconds=60 + random_() * 86400)) if status == 'completed' else None
+            kind = random_()
+
+            if kind < 0.5 or balance < 20:
+                wallet = wallets[int(random_() * len(wallets))]
+                amount = round(20 + 1980 * random_(), 2)
+                transaction_rows.append((
+                    user_id, 'deposit', amount, status, 'crypto', wallet['address'], f'DEP{user_id:08X}{index:04X}',
+                    None, wallet['symbol'], wallet['network'], f'{getrandbits(128):032x}',
+                    'Deposit verification failed' if status == 'rejected' else None, created, completed,
+                ))
+                if status == 'completed':
+                    balance += amount
+                    deposits += amount
+            elif kind < 0.8 or user_id == block_last_id:
+                wallet = wallets[int(random_() * len(wallets))]
+                amount = round(balance * (0.1 + 0.5 * random_()), 2)
+                transaction_rows.append((
+                    user_id, 'withdrawal', amount, status, 'crypto', f'wallet{user_id:08d}', f'WTH{user_id:08X}{index:04X}',
+                    None, wallet['symbol'], wallet['network'], None,
+                    'Withdrawal request denied' if status == 'rejected' else None, created, completed,
+                ))
+                if status == 'completed':
+                    balance -= amount
+                    withdrawals += amount
+            else:
+                recipient = user_id + 1 + int(random_() * (block_last_id - user_id))
+                amount = round(1 + (min(balance, 500) - 1) * random_(), 2)
+                reference = f'TRF{user_id:08X}{index:04X}'
+                transaction_rows.append((
+                    user_id, 'transfer', -amount, 'completed', None, None, reference,
+                    f'Transfer to user{recipient}', None, None, None, None, created, created,
+                ))
+                transaction_rows.append((
+                    recipient, 'transfer', amount, 'completed', None, None, reference,
+                    f'Transfer from user{user_id}', None, None, None, None, created, created,
+                ))
+                balance -= amount
+                incoming[recipient - first_id - first_offset] += amount
+
+        for _ in range(randint(0, 2 * notifications)):
+            title, message, kind = NOTIFICATIONS[int(random_() * len(NOTIFICATIONS))]
+            notification_rows.append((
+                user_id, title, message, kind, random_() < 0.7,
+                stamp(signed_up + timedelta(seconds=random_() * span)),
+            ))
+
+        account_rows.append((
+            user_id, round(balance + incoming[offset - first_offset], 2), round(demo_balance, 2), round(profit, 2),
+            round(deposits, 2), round(withdrawals, 2), 'standard', stamp(signed_up),
+        ))
+        for is_demo, values in summaries.items():
+            if values[0] or values[2]:
+                summary_rows.append((user_id, is_demo, *values, stamp(now)))
+    return rows
+
+def seed(users=1000, transactions=20, trades=20, notifications=10, seed=1, jobs=1, chunk=20000, now=None):
+    """
+    Generate and insert the dataset inside the current app context and
+    commit it. Returns the seeded user id range and per-table row counts.
+    """
+    writer = BulkWriter(db.session.connection(), chunk)
+    options = {
+        'users': users,
+        'transactions': transactions,
+        'trades': trades,
+        'notifications': notifications,
+        'seed': seed,
+        'first_id': (db.session.query(db.func.max(User.id)).scalar() or 0) + 1,
+        'now': now or datetime.utcnow(),
+        'password_hash': generate_password_hash(PASSWORD),
+        'postgres': writer.postgres,
+    }
+    blocks = range(-(-users // BLOCK_USERS))
+    build = partial(generate_block, options)
+
+    if jobs > 1:
+        # Bounded waves keep at most two blocks per worker in memory while the parent writes
+        with multiprocessing.get_context('fork').Pool(jobs) as pool:
+            for wave in range(0, len(blocks), jobs * 2):
+                for rows in pool.map(build, blocks[wave:wave + jobs * 2]):
+                    for table, table_rows in rows.items():
+                        writer.write(table, table_rows)
+    else:
+        for block in blocks:
+            for table, table_rows in build(block).items():
+                writer.write(table, table_rows)
+    writer.finish()
+
+    snapshot_unledgered_accounts()
+    if writer.postgres:
+        db.session.execute(db.text(
+            "SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))"
+        ))
+    db.session.commit()
+
+    first_id = options['first_id']
+    return {'first_user_id': first_id, 'last_user_id': first_id + users - 1, 'rows': dict(writer.counts)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=20, help='average per user')
+    parser.add_argument('--trades', type=int, default=20, help='average per user')
+    parser.add_argument('--notifications', type=int, default=10, help='average per user')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='generator processes')
+    parser.add_argument('--chunk', type=int, default=20000, help='rows per executemany')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--now', type=datetime.fromisoformat, help='end of the generated history (UTC ISO datetime)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with app.app_context():
+        result = seed(args.users, args.transactions, args.trades, args.notifications, args.seed, args.jobs, args.chunk, args.now)
+    elapsed = time.perf_counter() - started
+    total = sum(result['rows'].values())
+    print(f'seeded users {result["first_user_id"]}-{result["last_user_id"]}: {result["rows"]}')
+    print(f'{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)')
+
+if __name__ == '__main__':
+    main()
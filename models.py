@@ -21,6 +21,8 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    # Bumped on commit whenever this user's rows change; GET endpoints derive ETags from it
+    data_version = db.Column(db.Integer, default=0)
     
     account = db.relationship('Account', backref='user', uselist=False, cascade='all, delete-orphan')
     transactions = db.relationship('Transaction', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -36,6 +38,9 @@ class User(UserMixin, db.Model):
 
 class Account(db.Model):
     __tablename__ = 'accounts'
+    __table_args__ = (
+        db.Index('ix_accounts_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -50,6 +55,11 @@ class Account(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_user_created', 'user_id', 'created_at'),
+        db.Index('ix_transactions_user_type_created', 'user_id', 'type', 'created_at'),
+        db.Index('ix_transactions_type_status_created', 'type', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -70,6 +80,10 @@ class Transaction(db.Model):
 
 class Investment(db.Model):
     __tablename__ = 'investments'
+    __table_args__ = (
+        db.Index('ix_investments_user_status', 'user_id', 'status'),
+        db.Index('ix_investments_user_start', 'user_id', 'start_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -85,6 +99,12 @@ class Investment(db.Model):
 
 class Trade(db.Model):
     __tablename__ = 'trades'
+    __table_args__ = (
+        db.Index('ix_trades_user_demo_status_created', 'user_id', 'is_demo', 'status', 'created_at'),
+        db.Index('ix_trades_user_status_closed', 'user_id', 'status', 'closed_at'),
+        db.Index('ix_trades_user_demo_status_closed', 'user_id', 'is_demo', 'status', 'closed_at'),
+        db.Index('ix_trades_status_expires', 'status', 'expires_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -99,9 +119,13 @@ class Trade(db.Model):
     is_demo = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     closed_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
 
 class Loan(db.Model):
     __tablename__ = 'loans'
+    __table_args__ = (
+        db.Index('ix_loans_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -144,6 +168,9 @@ class BotTrading(db.Model):
 
 class Referral(db.Model):
     __tablename__ = 'referrals'
+    __table_args__ = (
+        db.Index('ix_referrals_referrer', 'referrer_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     referrer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -155,6 +182,9 @@ class Referral(db.Model):
 
 class SupportTicket(db.Model):
     __tablename__ = 'support_tickets'
+    __table_args__ = (
+        db.Index('ix_support_tickets_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -168,6 +198,9 @@ class SupportTicket(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -192,6 +225,9 @@ class TradeRule(db.Model):
 
 class Subscription(db.Model):
     __tablename__ = 'subscriptions'
+    __table_args__ = (
+        db.Index('ix_subscriptions_status_created', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -205,3 +241,50 @@ class Subscription(db.Model):
     expires_at = db.Column(db.DateTime)
     
     user = db.relationship('User', backref=db.backref('subscriptions', lazy=True))
+
+class TradingSummary(db.Model):
+    __tablename__ = 'trading_summaries'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'is_demo', name='uq_trading_summaries_user_mode'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    is_demo = db.Column(db.Boolean, nullable=False, default=False)
+    open_trades = db.Column(db.Integer, nullable=False, default=0)
+    open_amount = db.Column(db.Float, nullable=False, default=0.0)
+    closed_trades = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    total_profit = db.Column(db.Float, nullable=False, default=0.0)
+    total_loss = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class LedgerEntry(db.Model):
+    __tablename__ = 'ledger_entries'
+    __table_args__ = (
+        db.Index('ix_ledger_entries_user_id', 'user_id', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    field = db.Column(db.String(30), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    kind = db.Column(db.String(30), nullable=False)
+    reference = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BalanceSnapshot(db.Model):
+    __tablename__ = 'balance_snapshots'
+    __table_args__ = (
+        db.Index('ix_balance_snapshots_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    ledger_id = db.Column(db.Integer, nullable=False, default=0)
+    balance = db.Column(db.Float, nullable=False, default=0.0)
+    demo_balance = db.Column(db.Float, nullable=False, default=0.0)
+    total_profit = db.Column(db.Float, nullable=False, default=0.0)
+    total_deposits = db.Column(db.Float, nullable=False, default=0.0)
+    total_withdrawals = db.Column(db.Float, nullable=False, default=0.0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,145 @@
+"""
+Shared JSON shapes for model rows.
+
+Each Serializer describes one API shape of a model and is built once at
+import: it resolves the columns, notes which ones are datetimes and keeps
+an attribute getter, so encoding a row is a tuple walk rather than a
+hand-written dict per endpoint. Query the serializer's columns
+(db.session.query(*TRADE.columns)) and pass the rows to rows(); ORM
+instances go through objects().
+
+OrjsonProvider replaces Flask's JSON encoder with orjson when it is
+installed, keeping the default provider's output (sorted keys, HTTP dates
+for raw datetimes).
+"""
+from operator import attrgetter
+from datetime import datetime
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import DateTime
+
+from models import Transaction, Trade, Investment, Loan, CopyTrading, BotTrading, SupportTicket, Notification
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class Serializer:
+    """
+    Row-to-dict encoder for a fixed list of model columns. Extra keyword
+    arguments add computed keys: each is called with the source row (or
+    instance) and sees the raw column values, e.g. datetimes before they are
+    turned into ISO strings.
+    """
+    def __init__(self, model, fields, **computed):
+        self.model = model
+        self.fields = tuple(fields)
+        self.columns = tuple(getattr(model, field) for field in self.fields)
+        self.keys = self.fields + tuple(computed)
+        self._computed = tuple(computed.values())
+        self._datetimes = tuple(i for i, column in enumerate(self.columns) if isinstance(column.type, DateTime))
+        self._values = attrgetter(*self.fields)
+
+    def _encode(self, values, source):
+        values = list(values)
+        for i in self._datetimes:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        for compute in self._computed:
+            values.append(compute(source))
+        return dict(zip(self.keys, values))
+
+    def row(self, row):
+        """Encode a row selected with self.columns, in that order."""
+        return self._encode(row, row)
+
+    def rows(self, rows):
+        return [self._encode(row, row) for row in rows]
+
+    def object(self, instance):
+        return self._encode(self._values(instance), instance)
+
+    def objects(self, instances):
+        return [self.object(instance) for instance in instances]
+
+def time_ago(dt):
+    diff = datetime.utcnow() - dt
+    if diff.days > 0:
+        return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
+    elif diff.seconds >= 3600:
+        hours = diff.seconds // 3600
+        return f"{hours} hour{'s' if hours > 1 else ''} ago"
+    elif diff.seconds >= 60:
+        minutes = diff.seconds // 60
+        return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+    else:
+        return "Just now"
+
+def trade_result(row):
+    return 'win' if row.profit_loss > 0 else 'loss'
+
+TRANSACTION = Serializer(Transaction, (
+    'id', 'type', 'amount', 'status', 'payment_method', 'crypto_type', 'crypto_network', 'txid', 'description',
+    'created_at', 'completed_at'
+))
+RECENT_TRANSACTION = Serializer(Transaction, ('id', 'type', 'amount', 'status', 'created_at'))
+TRADE = Serializer(Trade, (
+    'id', 'symbol', 'trade_type', 'amount', 'entry_price', 'exit_price', 'profit_loss', 'leverage', 'status',
+    'created_at', 'closed_at'
+))
+OPEN_DEMO_TRADE = Serializer(Trade, ('id', 'symbol', 'trade_type', 'amount', 'entry_price', 'leverage', 'created_at'))
+DEMO_HISTORY_TRADE = Serializer(Trade, (
+    'id', 'symbol', 'trade_type', 'amount', 'entry_price', 'exit_price', 'profit_loss', 'leverage',
+    'created_at', 'closed_at'
+), result=trade_result)
+HISTORY_TRADE = Serializer(Trade, (
+    'id', 'symbol', 'trade_type', 'amount', 'entry_price', 'exit_price', 'profit_loss', 'leverage', 'is_demo',
+    'created_at', 'closed_at'
+), account_type=lambda row: 'DEMO' if row.is_demo else 'LIVE', result=trade_result)
+INVESTMENT = Serializer(Investment, (
+    'id', 'plan_name', 'plan_type', 'amount', 'expected_return', 'actual_return', 'duration_days', 'status',
+    'start_date', 'end_date'
+))
+ACTIVE_INVESTMENT = Serializer(Investment, ('id', 'plan_name', 'amount', 'expected_return', 'status'))
+LOAN = Serializer(Loan, (
+    'id', 'amount', 'interest_rate', 'duration_months', 'monthly_payment', 'total_repayment', 'amount_paid',
+    'status', 'purpose', 'created_at'
+))
+COPY_TRADING = Serializer(CopyTrading, (
+    'id', 'trader_name', 'amount_allocated', 'profit_share', 'total_profit', 'status', 'created_at'
+))
+BOT_TRADING = Serializer(BotTrading, (
+    'id', 'bot_name', 'strategy', 'amount_allocated', 'total_profit', 'trades_executed', 'win_rate', 'status',
+    'created_at'
+))
+SUPPORT_TICKET = Serializer(SupportTicket, (
+    'id', 'subject', 'message', 'priority', 'status', 'response', 'created_at', 'resolved_at'
+))
+NOTIFICATION = Serializer(Notification, (
+    'id', 'title', 'message', 'type', 'read', 'created_at'
+), time_ago=lambda row: time_ago(row.created_at))
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    DefaultJSONProvider with orjson doing the encoding. Keys stay sorted and
+    types orjson does not handle natively (including datetimes, which Flask
+    renders as HTTP dates) still go through DefaultJSONProvider.default.
+    Debug mode and calls with json.dumps keyword arguments use the stdlib
+    path so indented output still works.
+    """
+    option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
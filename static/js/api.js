@@ -1,32 +1,211 @@
 const API_BASE = '/api';
 
 const api = {
+    // Answers to GETs per URL: { data, etag, time }. A copy younger than its
+    // endpoint's TTL (cacheTtl, by path prefix, else cacheDefaultTtl) is
+    // returned without a request; for its stale window (cacheStaleTtl, else
+    // cacheStale) ms after that it is still returned at once while a
+    // background request refreshes it. Older copies are refetched, sending
+    // If-None-Match so an unchanged answer comes back as 304 Not Modified.
+    // The cache lives in sessionStorage across page loads; a successful
+    // POST/PUT/DELETE or a 'trade' event on an open stream expires every copy
+    // (the server versions all of a user's data together) and auth calls and
+    // 401s drop it. Writes sent with plain fetch, from this page or another
+    // tab, are caught through cookies the server rotates: a new cache_version
+    // (the user's data changed) expires the cache and a new cache_owner (a
+    // login or logout) drops it. Pass { revalidate: true } to skip the cached
+    // copy for one call.
+    cacheTtl: {
+        '/auth/check': 30000,
+        '/crypto/wallets': 300000,
+        '/crypto/wallet': 300000,
+        '/referral': 60000,
+        '/market/quotes': 5000
+    },
+    cacheDefaultTtl: 10000,
+    cacheStaleTtl: {
+        '/market/quotes': 5000
+    },
+    cacheStale: 60000,
+    cacheLimit: 100,
+    _cache: new Map(),
+    _owner: '',
+    _version: '',
+    _generation: 0,
+
+    // Identical GETs already on the wire share one request.
+    _inflight: new Map(),
+
+    // How GETs were answered: 'hit' (fresh copy), 'stale' (copy returned
+    // while revalidating), 'shared' (joined a request in flight) or 'miss'.
+    // onCacheEvent, when set, is called with (kind, endpoint) for each.
+    cacheStats: { hit: 0, stale: 0, shared: 0, miss: 0 },
+    onCacheEvent: null,
+
+    // Plain GETs issued in the same tick (e.g. by several components starting
+    // up, or a Promise.all) go to the server as one POST /api/batch. Set to
+    // false to send every call on its own; pass { batch: false } to opt out
+    // for a single call.
+    batching: true,
+    batchLimit: 20,
+    _queue: [],
+
     async request(endpoint, options = {}) {
         const url = `${API_BASE}${endpoint}`;
+        if ((options.method || 'GET').toUpperCase() !== 'GET') {
+            const data = await api._send(endpoint, options);
+            api._sync();
+            if (endpoint.startsWith('/auth/')) {
+                api.clearCache();
+            } else {
+                api.invalidate();
+            }
+            return data;
+        }
+        
+        api._sync();
+        const entry = options.revalidate ? null : api._cache.get(url);
+        if (entry) {
+            const age = Date.now() - entry.time;
+            const ttl = api._prefixed(api.cacheTtl, endpoint, api.cacheDefaultTtl);
+            if (age < ttl) {
+                api._count('hit', endpoint);
+                return entry.data;
+            }
+            if (age < ttl + api._prefixed(api.cacheStaleTtl, endpoint, api.cacheStale)) {
+                api._count('stale', endpoint);
+                api._load(endpoint, options).catch(() => {});
+                return entry.data;
+            }
+        }
+        api._count(api._inflight.has(url) ? 'shared' : 'miss', endpoint);
+        return api._load(endpoint, options);
+    },
+
+    // Expires every cached answer; the next read of each goes to the server
+    // (with its ETag, so unchanged data still costs only a 304).
+    invalidate() {
+        api._generation++;
+        api._inflight.clear();
+        for (const entry of api._cache.values()) {
+            entry.time = 0;
+        }
+    },
+
+    clearCache() {
+        api._generation++;
+        api._inflight.clear();
+        api._cache.clear();
+    },
+
+    // Catches up with the cache_owner and cache_version cookies.
+    _sync() {
+        const owner = api._cookie('cache_owner');
+        const version = api._cookie('cache_version');
+        if (owner !== api._owner) {
+            api.clearCache();
+        } else if (version !== api._version) {
+            api.invalidate();
+        }
+        api._owner = owner;
+        api._version = version;
+    },
+
+    _cookie(name) {
+        const match = document.cookie.match(new RegExp(`(?:^|;\\s*)${name}=([^;]*)`));
+        return match ? match[1] : '';
+    },
+
+    // The value for the first path prefix in map that endpoint falls under, else fallback.
+    _prefixed(map, endpoint, fallback) {
+        const path = endpoint.split('?')[0];
+        for (const [prefix, value] of Object.entries(map)) {
+            if (path === prefix || path.startsWith(`${prefix}/`)) {
+                return value;
+            }
+        }
+        return fallback;
+    },
+
+    _count(kind, endpoint) {
+        api.cacheStats[kind]++;
+        if (api.onCacheEvent) {
+            api.onCacheEvent(kind, endpoint);
+        }
+    },
+
+    // Answers fetched before an invalidate() are handed to their callers but
+    // not kept.
+    _store(url, etag, data, generation) {
+        if (generation !== api._generation) {
+            return;
+        }
+        api._cache.delete(url);
+        api._cache.set(url, { data, etag, time: Date.now() });
+        if (api._cache.size > api.cacheLimit) {
+            api._cache.delete(api._cache.keys().next().value);
+        }
+    },
+
+    _load(endpoint, options) {
+        const url = `${API_BASE}${endpoint}`;
+        let pending = api._inflight.get(url);
+        if (!pending) {
+            const plain = !options.headers && options.batch !== false;
+            pending = api.batching && plain ? api._enqueue(endpoint) : api._send(endpoint, options);
+            api._inflight.set(url, pending);
+            const settle = () => {
+                if (api._inflight.get(url) === pending) {
+                    api._inflight.delete(url);
+                }
+            };
+            pending.then(settle, settle);
+        }
+        return pending;
+    },
+
+    async _send(endpoint, options = {}) {
+        const { batch, revalidate, ...init } = options;
+        const url = `${API_BASE}${endpoint}`;
+        const isGet = (init.method || 'GET').toUpperCase() === 'GET';
+        const entry = isGet ? api._cache.get(url) : null;
+        const generation = api._generation;
         const config = {
             headers: {
                 'Content-Type': 'application/json',
-                ...options.headers
+                ...(entry && entry.etag ? { 'If-None-Match': entry.etag } : {}),
+                ...init.headers
             },
             credentials: 'include',
-            ...options
+            ...init
         };
         
-        if (options.body && typeof options.body === 'object' && !(options.body instanceof FormData)) {
-            config.body = JSON.stringify(options.body);
-        } else if (options.body instanceof FormData) {
+        if (init.body && typeof init.body === 'object' && !(init.body instanceof FormData)) {
+            config.body = JSON.stringify(init.body);
+        } else if (init.body instanceof FormData) {
             delete config.headers['Content-Type'];
-            config.body = options.body;
+            config.body = init.body;
         }
         
         try {
             const response = await fetch(url, config);
+            if (response.status === 304 && entry) {
+                api._store(url, entry.etag, entry.data, generation);
+                return entry.data;
+            }
+            if (response.status === 401) {
+                api.clearCache();
+            }
             const data = await response.json();
             
             if (!response.ok) {
                 throw new Error(data.message || 'Request failed');
             }
             
+            if (isGet) {
+                api._store(url, response.headers.get('ETag'), data, generation);
+            }
+            
             return data;
         } catch (error) {
             console.error('API Error:', error);
@@ -34,6 +213,148 @@ const api = {
         }
     },
 
+    _enqueue(endpoint) {
+        return new Promise((resolve, reject) => {
+            api._queue.push({ endpoint, resolve, reject });
+            if (api._queue.length === 1) {
+                setTimeout(api._flush, 0);
+            }
+        });
+    },
+
+    async _flush() {
+        const queue = api._queue.splice(0);
+        for (let start = 0; start < queue.length; start += api.batchLimit) {
+            const calls = queue.slice(start, start + api.batchLimit);
+            if (calls.length === 1) {
+                api._send(calls[0].endpoint).then(calls[0].resolve, calls[0].reject);
+                continue;
+            }
+            
+            const urls = calls.map(call => `${API_BASE}${call.endpoint}`);
+            const entries = urls.map(url => api._cache.get(url));
+            const generation = api._generation;
+            let responses;
+            try {
+                const response = await fetch(`${API_BASE}/batch`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'include',
+                    body: JSON.stringify({
+                        requests: urls.map((url, i) => ({
+                            path: url,
+                            headers: entries[i] && entries[i].etag ? { 'If-None-Match': entries[i].etag } : {}
+                        }))
+                    })
+                });
+                if (!response.ok) {
+                    throw new Error(`Batch request failed with ${response.status}`);
+                }
+                responses = (await response.json()).responses;
+            } catch (error) {
+                // Fall back to separate requests so callers still get their answers
+                console.error('API Error:', error);
+                calls.forEach(call => api._send(call.endpoint).then(call.resolve, call.reject));
+                continue;
+            }
+            
+            calls.forEach((call, i) => {
+                const { status, etag, body } = responses[i];
+                if (status === 304 && entries[i]) {
+                    api._store(urls[i], entries[i].etag, entries[i].data, generation);
+                    call.resolve(entries[i].data);
+                } else if (status < 200 || status >= 300) {
+                    if (status === 401) {
+                        api.clearCache();
+                    }
+                    const error = new Error((body && body.message) || 'Request failed');
+                    console.error('API Error:', error);
+                    call.reject(error);
+                } else {
+                    api._store(urls[i], etag, body, generation);
+                    call.resolve(body);
+                }
+            });
+        }
+    },
+
+    // Cached answers are carried over to the next page in sessionStorage. The
+    // saved copy is taken on load, so a page that cannot save (storage full or
+    // disabled) leaves nothing outdated behind.
+    _restore() {
+        api._owner = api._cookie('cache_owner');
+        api._version = api._cookie('cache_version');
+        try {
+            const saved = JSON.parse(sessionStorage.getItem('api-cache'));
+            sessionStorage.removeItem('api-cache');
+            if (saved && saved.owner === api._owner) {
+                api._cache = new Map(saved.entries);
+                if (saved.version !== api._version) {
+                    api.invalidate();
+                }
+            }
+        } catch (error) {
+            api._cache = new Map();
+        }
+    },
+
+    _persist() {
+        try {
+            sessionStorage.setItem('api-cache', JSON.stringify({ owner: api._owner, version: api._version, entries: [...api._cache] }));
+        } catch (error) {
+            console.error('API cache not saved:', error);
+        }
+    },
+
+    // Walks a cursor-paginated endpoint one page at a time:
+    //   for await (const page of api.pages('/trades/all-history')) { ... }
+    async *pages(endpoint, params = {}) {
+        let cursor = '';
+        do {
+            const query = new URLSearchParams();
+            for (const [key, value] of Object.entries(params)) {
+                if (value !== null && value !== undefined) query.set(key, value);
+            }
+            query.set('cursor', cursor);
+            const sep = endpoint.includes('?') ? '&' : '?';
+            const data = await api.request(`${endpoint}${sep}${query}`);
+            yield data;
+            cursor = data.next_cursor;
+        } while (cursor);
+    },
+
+    _streams: {},
+
+    // Subscribes to server-sent events from /api/stream. Components asking for
+    // the same symbols share one connection. Handlers receive parsed JSON for
+    // 'quote' and 'trade' events; returns a function that removes them. An
+    // 'error' handler gets the raw event: a CLOSED source means the server
+    // refused the stream (it answers 503 on a sync worker) and callers should
+    // fall back to polling.
+    stream(symbols, handlers = {}) {
+        const key = [...symbols].sort().join(',');
+        let source = api._streams[key];
+        if (!source) {
+            source = new EventSource(`${API_BASE}/stream?symbols=${encodeURIComponent(key)}`, { withCredentials: true });
+            api._streams[key] = source;
+            // The browser gives up on a stream the server refused; let the next caller retry
+            source.addEventListener('error', () => {
+                if (source.readyState === EventSource.CLOSED && api._streams[key] === source) {
+                    delete api._streams[key];
+                }
+            });
+            // Trades opened, closed or settled elsewhere (e.g. by the expiry
+            // settler) change balances and lists the cache may hold
+            source.addEventListener('trade', () => api.invalidate());
+        }
+        const listeners = Object.entries(handlers).map(([event, handler]) => {
+            const listener = event === 'error' ? handler : (e) => handler(JSON.parse(e.data));
+            source.addEventListener(event, listener);
+            return [event, listener];
+        });
+        return () => listeners.forEach(([event, listener]) => source.removeEventListener(event, listener));
+    },
+
     auth: {
         async register(userData) {
             return api.request('/auth/register', {
@@ -84,6 +405,12 @@ const api = {
             return api.request(url);
         },
 
+        async getPage(cursor = '', type = null, limit = 20) {
+            const query = new URLSearchParams({ cursor: cursor || '', limit });
+            if (type) query.set('type', type);
+            return api.request(`/transactions?${query}`);
+        },
+
         async deposit(amount, paymentMethod, walletAddress) {
             return api.request('/deposit', {
                 method: 'POST',
@@ -156,6 +483,17 @@ const api = {
             return api.request(url);
         },
 
+        async getPage(cursor = '', demo = false, status = null, limit = 20) {
+            const query = new URLSearchParams({ demo, cursor: cursor || '', limit });
+            if (status) query.set('status', status);
+            return api.request(`/trades?${query}`);
+        },
+
+        async getHistoryPage(cursor = '', limit = 20) {
+            const query = new URLSearchParams({ cursor: cursor || '', limit });
+            return api.request(`/trades/all-history?${query}`);
+        },
+
         async create(symbol, tradeType, amount, entryPrice, leverage = 1, isDemo = false) {
             return api.request('/trades', {
                 method: 'POST',
@@ -174,6 +512,16 @@ const api = {
             return api.request(`/trades/${tradeId}`, {
                 method: 'DELETE'
             });
+        },
+
+        // Accepts an array of trade ids or a filter object
+        // ({ is_demo, status, before }); open trades are never deleted.
+        async deleteMany(idsOrFilters) {
+            const body = Array.isArray(idsOrFilters) ? { ids: idsOrFilters } : idsOrFilters;
+            return api.request('/trades/bulk-delete', {
+                method: 'POST',
+                body
+            });
         }
     },
 
@@ -320,9 +668,7 @@ function userData() {
         
         async init() {
             await this.loadUserData();
-            await this.loadNotifications();
-            await this.loadDepositHistory();
-            await this.loadTrades();
+            await Promise.all([this.loadNotifications(), this.loadDepositHistory(), this.loadTrades()]);
         },
         
         async loadNotifications() {
@@ -596,6 +942,9 @@ function withdrawalHistory() {
     };
 }
 
+api._restore();
+window.addEventListener('pagehide', api._persist);
+
 window.api = api;
 window.checkAuth = checkAuth;
 window.requireAuth = requireAuth;
@@ -0,0 +1,80 @@
+"""
+Identity loading: one joined User/Account query per request, none on an
+IdentityCache hit.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='test-identity-'), 'test.db')
+os.environ['DEMO_EXPIRY_SCHEDULER'] = '0'
+os.environ['MARKET_DATA_PROVIDER'] = 'fixture'
+
+import pytest
+
+from app import app, db, identity_cache
+
+PASSWORD = 'test-password'
+
+@pytest.fixture
+def client():
+    client = app.test_client()
+    client.post('/api/auth/register', json={'username': 'identity', 'email': 'identity@example.com', 'password': PASSWORD})
+    response = client.post('/api/auth/login', json={'email': 'identity@example.com', 'password': PASSWORD})
+    assert response.status_code == 200
+    return client
+
+@pytest.fixture
+def identity_queries():
+    """Statements that load the user with their account, as load_user does."""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM users LEFT OUTER JOIN accounts' in statement:
+            statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    db.event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    db.event.remove(engine, 'before_cursor_execute', record)
+
+@pytest.fixture
+def cache_ttl():
+    ttl = identity_cache.ttl
+    identity_cache._entries.clear()
+    yield lambda value: setattr(identity_cache, 'ttl', value)
+    identity_cache.ttl = ttl
+    identity_cache._entries.clear()
+
+def test_one_identity_query_without_cache(client, identity_queries, cache_ttl):
+    cache_ttl(0)
+    for _ in range(2):
+        identity_queries.clear()
+        assert client.get('/api/user/profile').status_code == 200
+        assert len(identity_queries) == 1
+
+def test_no_identity_query_on_cache_hit(client, identity_queries, cache_ttl):
+    cache_ttl(60)
+    assert client.get('/api/user/profile').status_code == 200
+    assert len(identity_queries) == 1
+
+    identity_queries.clear()
+    response = client.get('/api/user/profile')
+    assert response.status_code == 200
+    assert response.get_json()['user']['email'] == 'identity@example.com'
+    assert identity_queries == []
+
+def test_write_request_reloads_identity(client, identity_queries, cache_ttl):
+    cache_ttl(60)
+    client.get('/api/user/profile')
+
+    identity_queries.clear()
+    assert client.put('/api/user/profile', json={'full_name': 'Identity Test'}).status_code == 200
+    assert len(identity_queries) == 1
+
+    identity_queries.clear()
+    assert client.get('/api/user/profile').get_json()['user']['full_name'] == 'Identity Test'
+    assert len(identity_queries) == 1